@@ -1,33 +1,84 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, jsonify
+from flask import (Flask, render_template, redirect, url_for, request, flash, jsonify, send_from_directory,
+                   Response, stream_with_context, abort)
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from functools import wraps
 import os
 import datetime
+import tempfile
+import base64
+import csv
+import io
+import json
 from werkzeug.utils import secure_filename
+from db_config import configure_database
+from query_budget import init_query_budget, query_budget
+import image_pipeline
+import dedupe
+from assets import init_assets
+from user_cache import init_user_cache
+from hashing import HashingBusy, init_password_hasher
+from page_cache import init_page_cache
+from metrics import init_metrics
+from jobs import init_job_queue, job_to_dict
+import click
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import inspect as sa_inspect
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key_here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///barangay.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600
+app.config['RESIDENTS_PAGE_SIZE'] = int(os.environ.get('RESIDENTS_PAGE_SIZE', 50))
+app.config['RESIDENTS_MAX_PAGE_SIZE'] = 200
+app.config['HOUSEHOLDS_PAGE_SIZE'] = int(os.environ.get('HOUSEHOLDS_PAGE_SIZE', 30))
+configure_database(app)
 
 db = SQLAlchemy(app)
 bcrypt = Bcrypt(app)
+password_hasher = init_password_hasher(app, bcrypt)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'warning'
+init_query_budget(app)
+init_assets(app)
+page_cache = init_page_cache(app)
+init_metrics(app, password_hasher)
 
 
 UPLOAD_DIR = os.path.join(app.static_folder, 'uploads', 'elected_officials')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-ALLOWED_EXT = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_EXT = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXT
 
+def schedule_photo_gc():
+    """Remove upload files no official references, off the request thread."""
+    referenced = {name for (name,) in db.session.query(ElectedOfficial.photo_filename) if name}
+    image_pipeline.executor.submit(image_pipeline.collect_garbage, UPLOAD_DIR, referenced)
+
+def schedule_photo_encoding(key, original_path):
+    job_queue.enqueue('encode_photo', {'key': key, 'original': os.path.basename(original_path)},
+                      created_by=current_user.id)
+
+@app.template_global()
+def official_photo(official, size='card'):
+    """URLs for an official's photo: {'webp': url or None, 'src': fallback url}."""
+    name = official.photo_filename if official else None
+    if image_pipeline.is_content_key(name):
+        webp, src = image_pipeline.photo_files(UPLOAD_DIR, name, size)
+        if src:
+            return {'webp': url_for('official_media', name=webp) if webp else None,
+                    'src': url_for('official_media', name=src)}
+    # Photos uploaded before the pipeline keep their original file name.
+    return {'webp': None,
+            'src': url_for('static', filename='uploads/elected_officials/' + (name or 'default.png'))}
+
 
 class Admin(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -36,6 +87,10 @@ class Admin(db.Model, UserMixin):
     role = db.Column(db.String(10), nullable=False, default='user')
 
 class Household(db.Model):
+    __table_args__ = (
+        db.Index('ix_household_barangay_no', 'barangay', 'household_no'),
+        db.Index('ix_household_purok_no', 'purok', 'household_no'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     household_no = db.Column(db.String(50), unique=True, nullable=False)
     region = db.Column(db.String(50), nullable=True)
@@ -46,7 +101,20 @@ class Household(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     members = db.relationship('Resident', back_populates='household', lazy='dynamic')
 
+# Case-insensitive prefix search for the household typeahead (household_lookup).
+HOUSEHOLD_LOOKUP_INDEXES = {
+    column.key: db.Index(f'ix_household_lower_{column.key}', db.func.lower(column), Household.household_no)
+    for column in (Household.household_no, Household.barangay, Household.purok)
+}
+
 class Resident(db.Model):
+    __table_args__ = (
+        db.Index('ix_resident_first_name_id', 'first_name', 'id'),
+        db.Index('ix_resident_household_name', 'household_id', 'last_name', 'first_name'),
+        # Blocking keys for duplicate detection (see dedupe.py).
+        db.Index('ix_resident_dedupe_dob_key', 'dedupe_dob_key'),
+        db.Index('ix_resident_dedupe_year_key', 'dedupe_year_key'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     last_name = db.Column(db.String(150), nullable=False)
     first_name = db.Column(db.String(150), nullable=False)
@@ -62,9 +130,17 @@ class Resident(db.Model):
     citizenship = db.Column(db.String(100), nullable=True)
     occupation = db.Column(db.String(150), nullable=True)
     household_id = db.Column(db.Integer, db.ForeignKey('household.id'), nullable=True)
+    dedupe_dob_key = db.Column(db.String(20), nullable=True)
+    dedupe_year_key = db.Column(db.String(120), nullable=True)
     household = db.relationship('Household', back_populates='members')
 
 class PendingResident(db.Model):
+    __table_args__ = (
+        db.Index('ix_pending_resident_status_submitted', 'status', 'submitted_at'),
+        db.Index('ix_pending_resident_submitter_submitted', 'submitted_by', 'submitted_at'),
+        # A device's idempotency key, unique per submitter (NULLs never collide).
+        db.Index('ix_pending_resident_submitter_client_key', 'submitted_by', 'client_key', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     last_name = db.Column(db.String(150), nullable=False)
     first_name = db.Column(db.String(150), nullable=False)
@@ -91,6 +167,7 @@ class PendingResident(db.Model):
     submitted_by = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=False)
     submitted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
+    client_key = db.Column(db.String(100), nullable=True)
     reviewed_by = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=True)
     reviewed_at = db.Column(db.DateTime, nullable=True)
     
@@ -98,6 +175,9 @@ class PendingResident(db.Model):
     reviewer = db.relationship('Admin', foreign_keys=[reviewed_by], backref='reviewed_submissions')
 
 class ElectedOfficial(db.Model):
+    __table_args__ = (
+        db.Index('ix_elected_official_position_order', 'position', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     position = db.Column(db.String(50), nullable=False)
@@ -106,6 +186,9 @@ class ElectedOfficial(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
 class BarangayEvent(db.Model):
+    __table_args__ = (
+        db.Index('ix_barangay_event_event_date', 'event_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -114,10 +197,357 @@ class BarangayEvent(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     admin = db.relationship('Admin', backref='events')
 
-
-@login_manager.user_loader
-def load_user(admin_id):
-    return Admin.query.get(int(admin_id))
+class PopulationStats(db.Model):
+    # Single materialized row (id=1) kept in step with Resident writes.
+    __tablename__ = 'population_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    total_population = db.Column(db.Integer, nullable=False, default=0)
+    total_males = db.Column(db.Integer, nullable=False, default=0)
+    total_females = db.Column(db.Integer, nullable=False, default=0)
+    total_voters = db.Column(db.Integer, nullable=False, default=0)
+    total_non_voters = db.Column(db.Integer, nullable=False, default=0)
+    total_senior_citizens = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+class DemographicCell(db.Model):
+    # Resident counts per combination of the cube dimensions, kept in step
+    # with Resident writes like population_stats.
+    __tablename__ = 'demographic_cube'
+    purok = db.Column(db.String(100), primary_key=True)
+    gender = db.Column(db.String(10), primary_key=True)
+    age_bracket = db.Column(db.Integer, primary_key=True)  # lower bound of a 5-year band; 80 means 80+
+    voter_status = db.Column(db.String(20), primary_key=True)
+    senior_citizen = db.Column(db.String(5), primary_key=True)
+    civil_status = db.Column(db.String(50), primary_key=True)  # '' when not recorded
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    # Background work for worker.py; see jobs.py.
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('admin.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+job_queue = init_job_queue(app, db, Job.__table__)
+
+class ChangeLogEntry(db.Model):
+    # Append-only feed of row changes for offline devices (GET /api/changes).
+    # AUTOINCREMENT keeps seq strictly increasing, even after compaction.
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_entity_row_seq', 'entity', 'entity_id', 'seq'),
+        {'sqlite_autoincrement': True},
+    )
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    data = db.Column(db.Text, nullable=True)  # the row as JSON; NULL for a delete (tombstone)
+    owner_id = db.Column(db.Integer, nullable=True)  # if set, only this user and admins see the entry
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
+POPULATION_STATS_ID = 1
+STAT_FIELDS = ('gender', 'voter_status', 'senior_citizen')
+# Resident columns whose changes move a resident between stats counters or cube cells.
+TRACKED_FIELDS = STAT_FIELDS + ('purok', 'age', 'civil_status')
+CUBE_DIMENSIONS = ('purok', 'gender', 'age_bracket', 'voter_status', 'senior_citizen', 'civil_status')
+AGE_BRACKET_WIDTH = 5
+AGE_BRACKET_TOP = 80
+
+def population_contribution(gender, voter_status, senior_citizen):
+    """Counters a single resident adds to the population_stats row."""
+    return {
+        'total_population': 1,
+        'total_males': int(gender == 'Male'),
+        'total_females': int(gender == 'Female'),
+        'total_voters': int(voter_status == 'Voter'),
+        'total_non_voters': int(voter_status == 'Non-Voter'),
+        'total_senior_citizens': int(senior_citizen == 'Yes'),
+    }
+
+def compute_population_stats(connection=None):
+    """Compute every dashboard counter in a single aggregate pass over Resident."""
+    def count_if(condition):
+        return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+    row = (connection or db.session).execute(db.select(
+        db.func.count(Resident.id),
+        count_if(Resident.gender == 'Male'),
+        count_if(Resident.gender == 'Female'),
+        count_if(Resident.voter_status == 'Voter'),
+        count_if(Resident.voter_status == 'Non-Voter'),
+        count_if(Resident.senior_citizen == 'Yes'),
+    )).one()
+    return dict(zip(('total_population', 'total_males', 'total_females',
+                     'total_voters', 'total_non_voters', 'total_senior_citizens'), row))
+
+def seed_population_stats(connection):
+    """Create the stats row if it is missing; a no-op when another worker won the race."""
+    connection.execute(insert_ignore(connection, PopulationStats.__table__).values(
+        id=POPULATION_STATS_ID, updated_at=datetime.datetime.utcnow(),
+        **compute_population_stats(connection)))
+
+def rebuild_population_stats():
+    """Recompute the materialized row from scratch (caller commits)."""
+    values = compute_population_stats()
+    stats = db.session.get(PopulationStats, POPULATION_STATS_ID)
+    if stats is None:
+        stats = PopulationStats(id=POPULATION_STATS_ID)
+        db.session.add(stats)
+    for key, value in values.items():
+        setattr(stats, key, value)
+    stats.updated_at = datetime.datetime.utcnow()
+    return stats
+
+def get_population_stats():
+    stats = db.session.get(PopulationStats, POPULATION_STATS_ID)
+    if stats is None:
+        # Normally seeded by migrate.py; deltas only apply once the row exists.
+        seed_population_stats(db.session.connection())
+        db.session.commit()
+        stats = db.session.get(PopulationStats, POPULATION_STATS_ID)
+    return stats
+
+def apply_population_delta(connection, delta, touch=False):
+    """Add ``delta`` to the stats row using the caller's connection/transaction.
+
+    With ``touch`` the row is written (updated_at) even when nothing changed,
+    which takes the database write lock up front.
+    """
+    delta = {k: v for k, v in delta.items() if v}
+    if not (delta or touch):
+        return
+    table = PopulationStats.__table__
+    values = {k: table.c[k] + v for k, v in delta.items()}
+    values['updated_at'] = datetime.datetime.utcnow()
+    connection.execute(
+        table.update().where(table.c.id == POPULATION_STATS_ID).values(**values)
+    )
+
+def insert_ignore(connection, table):
+    """INSERT that silently skips rows hitting a unique constraint."""
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table).on_conflict_do_nothing()
+
+def age_bracket(age):
+    return min(max(int(age or 0), 0) // AGE_BRACKET_WIDTH * AGE_BRACKET_WIDTH, AGE_BRACKET_TOP)
+
+def age_bracket_label(bracket):
+    if bracket >= AGE_BRACKET_TOP:
+        return f'{AGE_BRACKET_TOP}+'
+    return f'{bracket}-{bracket + AGE_BRACKET_WIDTH - 1}'
+
+def cube_cell(gender, voter_status, senior_citizen, purok, age, civil_status):
+    """The cube key of a resident, from its TRACKED_FIELDS values."""
+    return (purok, gender, age_bracket(age), voter_status, senior_citizen, civil_status or '')
+
+def apply_cube_delta(connection, delta):
+    """Add ``delta`` ({cube key: change}) to the cube in the caller's transaction."""
+    rows = [dict(zip(CUBE_DIMENSIONS, key), count=change) for key, change in delta.items() if change]
+    if not rows:
+        return
+    table = DemographicCell.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(table)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=list(CUBE_DIMENSIONS),
+        set_={'count': table.c.count + stmt.excluded.count},
+    ), rows)
+
+def rebuild_demographic_cube(connection):
+    """Recompute every cube cell with one GROUP BY over Resident."""
+    bracket = db.case((Resident.age >= AGE_BRACKET_TOP, AGE_BRACKET_TOP),
+                      else_=(Resident.age // AGE_BRACKET_WIDTH) * AGE_BRACKET_WIDTH)
+    columns = (Resident.purok, Resident.gender, bracket, Resident.voter_status,
+               Resident.senior_citizen, db.func.coalesce(Resident.civil_status, ''))
+    connection.execute(DemographicCell.__table__.delete())
+    connection.execute(DemographicCell.__table__.insert().from_select(
+        list(CUBE_DIMENSIONS) + ['count'],
+        db.select(*columns, db.func.count()).group_by(*columns)))
+
+def _resident_values(resident):
+    """Current TRACKED_FIELDS values of a pending Resident, with column defaults."""
+    return (resident.gender, resident.voter_status or 'Voter', resident.senior_citizen or 'No',
+            resident.purok, resident.age, resident.civil_status)
+
+def _committed_resident_values(session, dirty):
+    """Pre-flush TRACKED_FIELDS values for modified residents."""
+    committed = {}
+    missing = []
+    for resident in dirty:
+        state = sa_inspect(resident)
+        values = []
+        for field in TRACKED_FIELDS:
+            history = state.attrs[field].history
+            if history.deleted:
+                values.append(history.deleted[0])
+            elif history.unchanged:
+                values.append(history.unchanged[0])
+            else:
+                missing.append(resident.id)
+                break
+        else:
+            committed[resident.id] = tuple(values)
+    if missing:
+        rows = session.connection().execute(
+            db.select(Resident.id, *(getattr(Resident, f) for f in TRACKED_FIELDS))
+            .where(Resident.id.in_(missing))
+        )
+        for row in rows:
+            committed[row.id] = tuple(row[1:])
+    return committed
+
+@event.listens_for(db.session, 'before_flush')
+def _track_population_stats(session, flush_context, instances):
+    delta, cube_delta = {}, {}
+
+    def add(values, sign):
+        for key, value in population_contribution(*values[:len(STAT_FIELDS)]).items():
+            delta[key] = delta.get(key, 0) + sign * value
+        cell = cube_cell(*values)
+        cube_delta[cell] = cube_delta.get(cell, 0) + sign
+
+    for obj in session.new:
+        if isinstance(obj, Resident):
+            add(_resident_values(obj), 1)
+
+    dirty = [obj for obj in session.dirty
+             if isinstance(obj, Resident) and session.is_modified(obj)
+             and any(sa_inspect(obj).attrs[f].history.has_changes() for f in TRACKED_FIELDS)]
+    if dirty:
+        committed = _committed_resident_values(session, dirty)
+        for obj in dirty:
+            add(committed[obj.id], -1)
+            add(_resident_values(obj), 1)
+
+    deleted = [obj for obj in session.deleted if isinstance(obj, Resident)]
+    if deleted:
+        committed = _committed_resident_values(session, deleted)
+        for obj in deleted:
+            add(committed[obj.id], -1)
+
+    apply_population_delta(session.connection(), delta)
+    apply_cube_delta(session.connection(), cube_delta)
+
+
+def touch_page_cache(session, *tables):
+    """Mark ``tables`` as changed; cached pages built from them expire on commit."""
+    session.info.setdefault('page_cache_tables', set()).update(tables)
+
+@event.listens_for(db.session, 'after_flush')
+def _track_page_cache(session, flush_context):
+    touch_page_cache(session, *(obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)))
+
+# Tables in the change feed; pending submissions are only shown to their submitter.
+CHANGE_FEED_TABLES = {table.name: table for table in (Resident.__table__, Household.__table__,
+                                                      PendingResident.__table__, ElectedOfficial.__table__)}
+CHANGE_FEED_OWNERS = {PendingResident.__table__.name: 'submitted_by'}
+# Columns each entry carries. Resident's is an explicit list so internal
+# bookkeeping columns (the dedupe_* blocking keys) never reach devices.
+CHANGE_FEED_COLUMNS = {name: [c.name for c in table.c] for name, table in CHANGE_FEED_TABLES.items()}
+CHANGE_FEED_COLUMNS[Resident.__table__.name] = [
+    'id', 'last_name', 'first_name', 'middle_name', 'gender', 'age', 'purok', 'voter_status',
+    'senior_citizen', 'date_of_birth', 'place_of_birth', 'civil_status', 'citizenship', 'occupation',
+    'household_id']
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def change_entry(table, values, op='upsert'):
+    """A change_log row for ``values``, a mapping of ``table``'s column values."""
+    owner = CHANGE_FEED_OWNERS.get(table.name)
+    return {
+        'entity': table.name,
+        'entity_id': values['id'],
+        'op': op,
+        'data': json.dumps({name: values.get(name) for name in CHANGE_FEED_COLUMNS[table.name]}, default=_json_value,
+                           separators=(',', ':')) if op == 'upsert' else None,
+        'owner_id': values.get(owner) if owner else None,
+        'changed_at': datetime.datetime.utcnow(),
+    }
+
+def record_changes(connection, entries):
+    """Append ``entries`` to the change log inside the caller's transaction."""
+    if entries:
+        connection.execute(ChangeLogEntry.__table__.insert(), entries)
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changes(session, flush_context):
+    dirty = [obj for obj in session.dirty if obj.__table__.name in CHANGE_FEED_TABLES
+             and session.is_modified(obj, include_collections=False)]
+    entries = []
+    for objects, op in ((session.new, 'upsert'), (dirty, 'upsert'), (session.deleted, 'delete')):
+        for obj in objects:
+            table = obj.__table__
+            if table.name in CHANGE_FEED_TABLES:
+                # The state dict, not getattr: loading an expired attribute mid-flush is not allowed.
+                state = sa_inspect(obj).dict
+                entries.append(change_entry(table, {c.name: state.get(c.key) for c in table.c}, op))
+    record_changes(session.connection(), entries)
+
+def seed_change_log(connection, batch_size=5000):
+    """Record every current row as an upsert, so a device syncing from 0 gets the full data set."""
+    for table in CHANGE_FEED_TABLES.values():
+        # Run from migrations too, where columns added by later ones do not exist yet.
+        present = {column['name'] for column in sa_inspect(connection).get_columns(table.name)}
+        columns = [table.c[name] for name in CHANGE_FEED_COLUMNS[table.name] if name in present]
+        last_id = 0
+        while True:
+            rows = connection.execute(db.select(*columns).where(table.c.id > last_id)
+                                      .order_by(table.c.id).limit(batch_size)).mappings().all()
+            if not rows:
+                break
+            record_changes(connection, [change_entry(table, row) for row in rows])
+            last_id = rows[-1]['id']
+
+# The Resident columns the blocking keys are built from, in dedupe.blocking_keys order.
+DEDUPE_FIELDS = ('last_name', 'first_name', 'date_of_birth', 'age', 'purok')
+
+def resident_blocking_keys(values, today=None):
+    """The dedupe_* column values for a mapping of resident fields (for Core inserts)."""
+    dob_key, year_key = dedupe.blocking_keys(*(values.get(f) for f in DEDUPE_FIELDS), today=today)
+    return {'dedupe_dob_key': dob_key, 'dedupe_year_key': year_key}
+
+@event.listens_for(Resident, 'before_insert')
+@event.listens_for(Resident, 'before_update')
+def _set_resident_blocking_keys(mapper, connection, target):
+    state = sa_inspect(target)
+    # Left alone on unrelated edits: a key estimated from the age stays as entered.
+    if state.persistent and not any(state.attrs[f].history.has_changes() for f in DEDUPE_FIELDS):
+        return
+    target.dedupe_dob_key, target.dedupe_year_key = dedupe.blocking_keys(
+        *(getattr(target, f) for f in DEDUPE_FIELDS))
+
+@event.listens_for(db.session, 'after_commit')
+def _expire_page_cache(session):
+    page_cache.bump(session.info.pop('page_cache_tables', ()))
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_page_cache(session):
+    session.info.pop('page_cache_tables', None)
+
+
+user_cache = init_user_cache(app, login_manager, lambda admin_id: db.session.get(Admin, admin_id))
 
 def admin_required(f):
     @wraps(f)
@@ -131,6 +561,37 @@ def admin_required(f):
     return decorated_function
 
 
+@app.route('/api/user_cache')
+@admin_required
+def user_cache_stats():
+    return jsonify(user_cache.stats())
+
+
+@app.route('/api/page_cache')
+@admin_required
+def page_cache_stats():
+    return jsonify(page_cache.stats())
+
+
+@app.route('/api/jobs/<int:id>')
+@query_budget(1)
+@login_required
+def job_status(id):
+    job = job_queue.get(id)
+    if job is None or (job['created_by'] != current_user.id and current_user.role != 'admin'):
+        return jsonify(error='Job not found.'), 404
+    return jsonify(job)
+
+@app.route('/api/jobs')
+@query_budget(1)
+@admin_required
+def recent_jobs():
+    query = db.select(Job.__table__).order_by(Job.id.desc()).limit(min(request.args.get('limit', 50, type=int), 500))
+    if request.args.get('status'):
+        query = query.where(Job.status == request.args['status'])
+    return jsonify(jobs=[job_to_dict(row) for row in db.session.execute(query)])
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -140,8 +601,13 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         admin = Admin.query.filter_by(username=username).first()
-        
-        if admin and bcrypt.check_password_hash(admin.password, password):
+        try:
+            valid = bool(admin) and password_hasher.check_password_hash(admin.password, password)
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '2'}
+
+        if valid:
             login_user(admin)
             flash('Logged in successfully.', 'success')
             return redirect(url_for('dashboard'))
@@ -159,26 +625,285 @@ def logout():
 
 
 @app.route('/dashboard')
+@query_budget(3)
 @login_required
 def dashboard():
-    total_population = Resident.query.count()
-    total_males = Resident.query.filter_by(gender='Male').count()
-    total_females = Resident.query.filter_by(gender='Female').count()
-    total_voters = Resident.query.filter_by(voter_status='Voter').count()
-    total_non_voters = Resident.query.filter_by(voter_status='Non-Voter').count()
-    total_senior_citizens = Resident.query.filter_by(senior_citizen='Yes').count()
+    stats = get_population_stats()
 
     return render_template('dashboard.html',
-                           total_population=total_population,
-                           total_males=total_males,
-                           total_females=total_females,
-                           total_voters=total_voters,
-                           total_non_voters=total_non_voters,
-                           total_senior_citizens=total_senior_citizens)
+                           total_population=stats.total_population,
+                           total_males=stats.total_males,
+                           total_females=stats.total_females,
+                           total_voters=stats.total_voters,
+                           total_non_voters=stats.total_non_voters,
+                           total_senior_citizens=stats.total_senior_citizens)
+
+
+def demographic_slice(args):
+    """Roll the cube up to ``group_by`` dimensions, filtered by the other args.
+
+    Every dimension can be filtered with one or more values (?purok=Purok 1&purok=Purok 2);
+    age_min/age_max keep the age brackets whose lower bound lies in the range.
+    Raises ValueError for an unknown dimension.
+    """
+    group_by = [d for d in args.get('group_by', '').split(',') if d]
+    unknown = set(group_by) - set(CUBE_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension: {', '.join(sorted(unknown))}")
+
+    columns = [getattr(DemographicCell, d) for d in group_by]
+    query = db.select(*columns, db.func.sum(DemographicCell.count)).where(DemographicCell.count > 0)
+    for dimension in CUBE_DIMENSIONS:
+        values = args.getlist(dimension)
+        if dimension == 'age_bracket':
+            values = [int(v.rstrip('+').split('-')[0]) for v in values if v.rstrip('+').split('-')[0].isdigit()]
+        if values:
+            query = query.where(getattr(DemographicCell, dimension).in_(values))
+    if args.get('age_min', type=int) is not None:
+        query = query.where(DemographicCell.age_bracket >= age_bracket(args.get('age_min', type=int)))
+    if args.get('age_max', type=int) is not None:
+        query = query.where(DemographicCell.age_bracket <= args.get('age_max', type=int))
+    query = query.group_by(*columns).order_by(*columns)
+
+    rows = []
+    for row in db.session.execute(query):
+        if row[-1] is None:
+            continue
+        cell = dict(zip(group_by, row[:-1]), count=row[-1])
+        if 'age_bracket' in cell:
+            cell['age_bracket'] = age_bracket_label(cell['age_bracket'])
+        rows.append(cell)
+    return group_by, rows
+
+@app.route('/api/analytics/demographics')
+@query_budget(1)
+@login_required
+@page_cache.cached('resident')
+def api_demographics():
+    try:
+        group_by, rows = demographic_slice(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e), dimensions=CUBE_DIMENSIONS), 400
+    return jsonify(group_by=group_by, dimensions=CUBE_DIMENSIONS,
+                   total=sum(row['count'] for row in rows), rows=rows)
+
+
+EVENTS_MAX_RANGE_DAYS = 366
+ICAL_WINDOW = (datetime.timedelta(days=90), datetime.timedelta(days=365))
+
+def event_range(args, default_from, default_to):
+    """Parse ?from=&to= (YYYY-MM-DD, inclusive); raises ValueError when invalid."""
+    try:
+        start = datetime.date.fromisoformat(args['from']) if args.get('from') else default_from
+        end = datetime.date.fromisoformat(args['to']) if args.get('to') else default_to
+    except ValueError:
+        raise ValueError('Dates must be YYYY-MM-DD.')
+    if end < start:
+        raise ValueError("'to' must not be before 'from'.")
+    return start, end
+
+def month_key(day):
+    return f'{day.year:04d}-{day.month:02d}'
+
+def month_bounds(day):
+    first = day.replace(day=1)
+    following = (first + datetime.timedelta(days=32)).replace(day=1)
+    return first, following - datetime.timedelta(days=1)
+
+def events_between(start, end):
+    return (BarangayEvent.query.options(db.joinedload(BarangayEvent.admin))
+            .filter(BarangayEvent.event_date.between(start, end))
+            .order_by(BarangayEvent.event_date, BarangayEvent.id).all())
+
+def event_to_dict(event):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description or '',
+        'date': event.event_date.isoformat(),
+        'created_by': event.admin.username if event.admin else None,
+    }
+
+def apply_event_fields(event, data):
+    """Copy title/description/date from a JSON or form payload; raises ValueError."""
+    if 'title' in data or event.title is None:
+        title = (data.get('title') or '').strip()
+        if not title:
+            raise ValueError('Title is required.')
+        event.title = title[:200]
+    if 'description' in data:
+        event.description = (data.get('description') or '').strip() or None
+    if 'date' in data or event.event_date is None:
+        try:
+            event.event_date = datetime.date.fromisoformat(data.get('date') or '')
+        except ValueError:
+            raise ValueError('Date must be YYYY-MM-DD.')
+
+def editable_event(id):
+    """The event, or an error response when it is missing or belongs to someone else."""
+    event = db.session.get(BarangayEvent, id)
+    if event is None:
+        return None, (jsonify(error='Event not found.'), 404)
+    if event.created_by != current_user.id and current_user.role != 'admin':
+        return None, (jsonify(error='Only the creator or an admin can change this event.'), 403)
+    return event, None
+
+@app.route('/api/events')
+@query_budget(1)
+@login_required
+@page_cache.cached('barangay_event')
+def api_events():
+    """Events between ?from= and ?to= (default: the current month), bucketed by month.
+
+    The calendar asks for one month at a time, so each month is its own cached,
+    ETag-validated response until an event changes.
+    """
+    first, last = month_bounds(datetime.date.today())
+    try:
+        start, end = event_range(request.args, first, last)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if (end - start).days >= EVENTS_MAX_RANGE_DAYS:
+        return jsonify(error=f'Ranges are limited to {EVENTS_MAX_RANGE_DAYS} days.'), 400
+
+    months = {}
+    day = start.replace(day=1)
+    while day <= end:
+        months[month_key(day)] = []
+        day = month_bounds(day)[1] + datetime.timedelta(days=1)
+    events = events_between(start, end)
+    for event in events:
+        months[month_key(event.event_date)].append(event_to_dict(event))
+    return jsonify({'from': start.isoformat(), 'to': end.isoformat(),
+                    'total': len(events), 'months': months})
+
+@app.route('/api/events', methods=['POST'])
+@login_required
+def create_event():
+    event = BarangayEvent(created_by=current_user.id)
+    try:
+        apply_event_fields(event, request.get_json(silent=True) or request.form)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    db.session.add(event)
+    db.session.commit()
+    response = jsonify(event_to_dict(event))
+    response.status_code = 201
+    response.headers['Location'] = url_for('update_event', id=event.id)
+    return response
+
+@app.route('/api/events/<int:id>', methods=['PUT', 'PATCH'])
+@login_required
+def update_event(id):
+    event, error = editable_event(id)
+    if error:
+        return error
+    try:
+        apply_event_fields(event, request.get_json(silent=True) or request.form)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify(error=str(e)), 400
+    db.session.commit()
+    return jsonify(event_to_dict(event))
+
+@app.route('/api/events/<int:id>', methods=['DELETE'])
+@login_required
+def delete_event(id):
+    event, error = editable_event(id)
+    if error:
+        return error
+    db.session.delete(event)
+    db.session.commit()
+    return '', 204
+
+def ical_text(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def ical_fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545, section 3.1)."""
+    data = line.encode('utf-8')
+    pieces, limit = [], 75
+    while len(data) > limit:
+        cut = limit
+        while (data[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        pieces.append(data[:cut].decode('utf-8'))
+        data, limit = data[cut:], 74
+    pieces.append(data.decode('utf-8'))
+    return '\r\n '.join(pieces)
+
+@app.route('/events.ics')
+@query_budget(1)
+@login_required
+@page_cache.cached('barangay_event')
+def events_ical():
+    """iCalendar feed of all-day events, by default from 90 days ago to a year ahead."""
+    today = datetime.date.today()
+    try:
+        start, end = event_range(request.args, today - ICAL_WINDOW[0], today + ICAL_WINDOW[1])
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    host = request.host.split(':')[0]
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Barangay Information System//Events//EN',
+             'CALSCALE:GREGORIAN', 'X-WR-CALNAME:Barangay Events']
+    for event in events_between(start, end):
+        stamp = event.created_at or datetime.datetime.utcnow()
+        lines += ['BEGIN:VEVENT',
+                  f'UID:event-{event.id}@{host}',
+                  f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}",
+                  f"DTSTART;VALUE=DATE:{event.event_date.strftime('%Y%m%d')}",
+                  f"DTEND;VALUE=DATE:{(event.event_date + datetime.timedelta(days=1)).strftime('%Y%m%d')}",
+                  f'SUMMARY:{ical_text(event.title)}']
+        if event.description:
+            lines.append(f'DESCRIPTION:{ical_text(event.description)}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    body = '\r\n'.join(ical_fold(line) for line in lines) + '\r\n'
+    return app.response_class(body, mimetype='text/calendar')
+
+
+CHANGES_PAGE_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+
+@app.route('/api/changes')
+@query_budget(1)
+@login_required
+def api_changes():
+    """Changes after ?since= (a cursor from the previous call; 0 for everything).
+
+    Entries come in seq order, at most ?limit= of them. Within a page only the
+    latest entry per row is kept, and deletes carry no data (tombstones).
+    Pass the returned cursor as the next since; more=true means call again.
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', CHANGES_PAGE_LIMIT, type=int), CHANGES_MAX_LIMIT))
+    log = ChangeLogEntry.__table__
+    query = db.select(log).where(log.c.seq > since).order_by(log.c.seq).limit(limit + 1)
+    if current_user.role != 'admin':
+        query = query.where(db.or_(log.c.owner_id.is_(None), log.c.owner_id == current_user.id))
+    rows = db.session.execute(query).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        latest.pop((row.entity, row.entity_id), None)
+        latest[(row.entity, row.entity_id)] = row
+    return jsonify(cursor=rows[-1].seq if rows else since, more=more, changes=[{
+        'seq': row.seq,
+        'entity': row.entity,
+        'id': row.entity_id,
+        'op': row.op,
+        'data': json.loads(row.data) if row.data else None,
+    } for row in latest.values()])
 
 
 @app.route('/elected_officials')
+@query_budget(3)
 @login_required
+@page_cache.cached('elected_official')
 def elected_officials():
     chairman = ElectedOfficial.query.filter_by(position='Chairman').first()
     kagawads = ElectedOfficial.query.filter_by(position='Kagawad').order_by(ElectedOfficial.order.is_(None), ElectedOfficial.order).all()
@@ -211,9 +936,11 @@ def add_elected_official():
             official = ElectedOfficial(name=name, position='Kagawad', order=order)
 
         if file and file.filename and allowed_file(file.filename):
-            filename = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S_') + secure_filename(file.filename)
-            file.save(os.path.join(UPLOAD_DIR, filename))
-            official.photo_filename = filename
+            try:
+                official.photo_filename = image_pipeline.save_photo(file, UPLOAD_DIR, schedule_photo_encoding)
+            except image_pipeline.InvalidImage as e:
+                flash(str(e), 'warning')
+                return redirect(url_for('add_elected_official'))
 
         db.session.add(official)
         db.session.commit()
@@ -251,16 +978,15 @@ def edit_elected_official(id):
         official.name = name
 
         if file and file.filename and allowed_file(file.filename):
-            if official.photo_filename:
-                old_path = os.path.join(UPLOAD_DIR, official.photo_filename)
-                if os.path.exists(old_path):
-                    try: os.remove(old_path)
-                    except: pass
-            filename = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S_') + secure_filename(file.filename)
-            file.save(os.path.join(UPLOAD_DIR, filename))
-            official.photo_filename = filename
+            try:
+                official.photo_filename = image_pipeline.save_photo(file, UPLOAD_DIR, schedule_photo_encoding)
+            except image_pipeline.InvalidImage as e:
+                db.session.rollback()
+                flash(str(e), 'warning')
+                return redirect(url_for('edit_elected_official', id=id))
 
         db.session.commit()
+        schedule_photo_gc()
         flash('Official updated.', 'success')
         return redirect(url_for('elected_officials'))
 
@@ -270,67 +996,401 @@ def edit_elected_official(id):
 @admin_required
 def delete_elected_official(id):
     official = ElectedOfficial.query.get_or_404(id)
-    if official.photo_filename:
-        p = os.path.join(UPLOAD_DIR, official.photo_filename)
-        if os.path.exists(p):
-            try: os.remove(p)
-            except: pass
     db.session.delete(official)
     db.session.commit()
+    schedule_photo_gc()
     flash('Official removed.', 'success')
     return redirect(url_for('elected_officials'))
 
 
-@app.route('/residents')
-@login_required
-def residents():
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token, key_type=str):
+    """Decode a page cursor, returning None for anything malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not (isinstance(values, list) and len(values) == 2
+            and isinstance(values[0], key_type) and isinstance(values[1], int)):
+        return None
+    return values
+
+def page_size_arg(default=None):
+    size = request.args.get('limit', type=int) or default or app.config['RESIDENTS_PAGE_SIZE']
+    return max(1, min(size, app.config['RESIDENTS_MAX_PAGE_SIZE']))
+
+def paginate_residents(query, after=None, before=None, limit=50):
+    """Keyset (seek) pagination over the (first_name, id) ordering.
+
+    Each page is a range scan starting at the cursor, so page 1000 costs the
+    same as page 1. Returns (rows, next_cursor, prev_cursor).
+    """
+    key = db.tuple_(Resident.first_name, Resident.id)
+    if before:
+        rows = (query.filter(key < db.tuple_(*before))
+                .order_by(Resident.first_name.desc(), Resident.id.desc())
+                .limit(limit + 1).all())
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        has_prev, has_next = has_more, True
+    else:
+        if after:
+            query = query.filter(key > db.tuple_(*after))
+        rows = query.order_by(Resident.first_name, Resident.id).limit(limit + 1).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_prev = after is not None
+
+    next_cursor = encode_cursor([rows[-1].first_name, rows[-1].id]) if rows and has_next else None
+    prev_cursor = encode_cursor([rows[0].first_name, rows[0].id]) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def resident_to_dict(resident):
+    return {
+        'id': resident.id,
+        'last_name': resident.last_name,
+        'first_name': resident.first_name,
+        'middle_name': resident.middle_name,
+        'gender': resident.gender,
+        'age': resident.age,
+        'purok': resident.purok,
+        'voter_status': resident.voter_status,
+        'senior_citizen': resident.senior_citizen,
+        'household_id': resident.household_id,
+    }
+
+# Full-text index over resident names. Trigram tokens give substring and
+# typo-tolerant matching; triggers keep it in step with every write to the
+# resident table, including bulk SQL that bypasses the ORM.
+RESIDENT_FTS_COLUMNS = ('first_name', 'middle_name', 'last_name', 'purok', 'occupation')
+RESIDENT_FTS_WEIGHTS = (3.0, 1.0, 3.0, 0.5, 0.5)
+
+def resident_fts_ddl():
+    cols = ', '.join(RESIDENT_FTS_COLUMNS)
+    new_cols = ', '.join(f'new.{c}' for c in RESIDENT_FTS_COLUMNS)
+    old_cols = ', '.join(f'old.{c}' for c in RESIDENT_FTS_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS resident_fts USING fts5("
+        f"{cols}, content='resident', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS resident_fts_ai AFTER INSERT ON resident BEGIN "
+        f"INSERT INTO resident_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS resident_fts_ad AFTER DELETE ON resident BEGIN "
+        f"INSERT INTO resident_fts(resident_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS resident_fts_au AFTER UPDATE ON resident BEGIN "
+        f"INSERT INTO resident_fts(resident_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO resident_fts(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+def create_resident_fts(connection):
+    for statement in resident_fts_ddl():
+        connection.execute(db.text(statement))
+
+def rebuild_resident_fts(connection):
+    create_resident_fts(connection)
+    connection.execute(db.text("INSERT INTO resident_fts(resident_fts) VALUES ('rebuild')"))
+
+_resident_fts_ready = False
+
+def resident_fts_ready():
+    global _resident_fts_ready
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    if not _resident_fts_ready:
+        _resident_fts_ready = db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resident_fts'"
+        )).first() is not None
+    return _resident_fts_ready
+
+def _fts_quote(token):
+    return '"' + token.replace('"', '""') + '"'
+
+def resident_match_queries(search):
+    """FTS5 MATCH expressions for ``search``: strict first, then fuzzy.
+
+    Strict requires every term (3+ chars) to appear as a substring of some
+    indexed column, so "juan cruz" finds first/last name combinations. The
+    fuzzy form ORs the terms' trigrams so misspellings still rank near their
+    intended name.
+    """
+    terms = [t for t in search.lower().split() if len(t) >= 3]
+    if not terms:
+        return []  # shorter terms are applied by name_prefix_filters instead
+    queries = [' AND '.join(_fts_quote(t) for t in terms)]
+    trigrams = sorted({t[i:i + 3] for t in terms if len(t) >= 4 for i in range(len(t) - 2)})
+    if trigrams:
+        queries.append(' OR '.join(_fts_quote(g) for g in trigrams))
+    return queries
+
+def short_search_terms(search):
+    """The terms of ``search`` too short for a trigram MATCH."""
+    return [t for t in search.lower().split() if len(t) < 3]
+
+def like_prefix(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def name_prefix_filters(terms):
+    """One filter per term: it must start the first or the last name."""
+    return [db.or_(Resident.first_name.ilike(like_prefix(t), escape='\\'),
+                   Resident.last_name.ilike(like_prefix(t), escape='\\')) for t in terms]
+
+def search_residents(match, after=None, before=None, limit=50, prefixes=()):
+    """Relevance-ranked keyset pagination over resident_fts.
+
+    Same contract as paginate_residents, but the cursor is (bm25 score, id).
+    Each of ``prefixes`` (terms too short for the MATCH) must also start the
+    first or the last name.
+    """
+    weights = ', '.join(str(w) for w in RESIDENT_FTS_WEIGHTS)
+    # SQLite's LIKE already ignores ASCII case.
+    conditions = ''.join(f" AND (resident.first_name LIKE :prefix{i} ESCAPE '\\' "
+                         f"OR resident.last_name LIKE :prefix{i} ESCAPE '\\')" for i in range(len(prefixes)))
+    join = ' JOIN resident ON resident.id = resident_fts.rowid' if prefixes else ''
+    sql = (f"SELECT id, score FROM (SELECT resident_fts.rowid AS id, bm25(resident_fts, {weights}) AS score "
+           f"FROM resident_fts{join} WHERE resident_fts MATCH :match{conditions}) ")
+    params = {'match': match, 'limit': limit + 1}
+    params.update((f'prefix{i}', like_prefix(t)) for i, t in enumerate(prefixes))
+    if before:
+        sql += "WHERE (score, id) < (:score, :id) ORDER BY score DESC, id DESC LIMIT :limit"
+        params.update(score=before[0], id=before[1])
+    elif after:
+        sql += "WHERE (score, id) > (:score, :id) ORDER BY score, id LIMIT :limit"
+        params.update(score=after[0], id=after[1])
+    else:
+        sql += "ORDER BY score, id LIMIT :limit"
+    hits = db.session.execute(db.text(sql), params).all()
+
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    if before:
+        hits.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+
+    by_id = {r.id: r for r in Resident.query.filter(Resident.id.in_([h.id for h in hits]))}
+    rows = [by_id[h.id] for h in hits if h.id in by_id]
+    next_cursor = encode_cursor([hits[-1].score, hits[-1].id]) if hits and has_next else None
+    prev_cursor = encode_cursor([hits[0].score, hits[0].id]) if hits and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def residents_page():
     search = request.args.get('search', '').strip()
+    limit = page_size_arg()
+
+    if search:
+        queries = resident_match_queries(search)
+        prefixes = short_search_terms(search)
+        if queries and resident_fts_ready():
+            after = decode_cursor(request.args.get('after'), (int, float))
+            before = decode_cursor(request.args.get('before'), (int, float))
+            page = search_residents(queries[0], after, before, limit, prefixes)
+            if page[0] or after or before or len(queries) == 1:
+                return page
+            # Nothing matched exactly: show the best fuzzy matches, unpaged.
+            return search_residents(queries[1], None, None, limit, prefixes)[0], None, None
+
     query = Resident.query
-    
     if search:
-        query = query.filter(Resident.first_name.ilike(f'{search}%'))
-    
-    residents_list = query.order_by(Resident.first_name).all()
-    return render_template('residents.html', residents=residents_list)
+        # No term long enough for trigrams (or no FTS): every term must start
+        # the first or the last name.
+        query = query.filter(*name_prefix_filters(search.lower().split()))
+
+    return paginate_residents(query,
+                              after=decode_cursor(request.args.get('after')),
+                              before=decode_cursor(request.args.get('before')),
+                              limit=limit)
+
+
+@app.route('/media/officials/<path:name>')
+def official_media(name):
+    response = send_from_directory(UPLOAD_DIR, name)
+    if image_pipeline.MANAGED_RE.match(name):
+        # Content-addressed: the bytes behind this URL never change.
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/residents')
+@query_budget(5)
+@login_required
+def residents():
+    residents_list, next_cursor, prev_cursor = residents_page()
+    return render_template('residents.html', residents=residents_list,
+                           next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+@app.route('/api/residents')
+@query_budget(5)
+@login_required
+def api_residents():
+    residents_list, next_cursor, prev_cursor = residents_page()
+    return jsonify(residents=[resident_to_dict(r) for r in residents_list],
+                   next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+class ResidentValidationError(ValueError):
+    pass
+
+RESIDENT_REQUIRED_FIELDS = ('last_name', 'first_name', 'middle_name', 'gender', 'age',
+                            'purok', 'voter_status', 'senior_citizen')
+RESIDENT_OPTIONAL_FIELDS = ('place_of_birth', 'civil_status', 'citizenship', 'occupation')
+
+def validate_resident_data(data):
+    """Apply add_resident's rules to a form, CSV row or JSON record.
+
+    Returns the Resident column values; raises ResidentValidationError with
+    the message add_resident flashes.
+    """
+    def get(name):
+        value = data.get(name)
+        return str(value).strip() if value is not None else ''
+
+    fields = {name: get(name) for name in RESIDENT_REQUIRED_FIELDS}
+    if not all(fields.values()):
+        raise ResidentValidationError('Fill all required fields.')
+
+    try:
+        fields['age'] = int(fields['age'])
+        if fields['age'] < 0:
+            raise ValueError
+    except ValueError:
+        raise ResidentValidationError('Age must be positive.')
+
+    fields['date_of_birth'] = None
+    if get('date_of_birth'):
+        try:
+            fields['date_of_birth'] = datetime.datetime.strptime(get('date_of_birth'), '%Y-%m-%d').date()
+        except ValueError:
+            raise ResidentValidationError('Invalid date format.')
+
+    for name in RESIDENT_OPTIONAL_FIELDS:
+        fields[name] = get(name) or None
+    return fields
+
+NEW_HOUSEHOLD_FIELDS = ('new_household_no', 'new_region', 'new_province',
+                        'new_city_municipality', 'new_barangay', 'new_purok')
+
+def pending_household(data, household_select, existing=None):
+    """Household columns of a submission: (household_id, new_household_* values).
+
+    ``household_select`` is 'new', 'none' or a household id, as in the
+    add_resident form. Raises ResidentValidationError when a new household
+    has no number or the chosen household does not exist; ``existing`` is
+    the set of existing household ids when the caller resolved them for a
+    whole batch, otherwise the id is looked up.
+    """
+    if household_select == 'new':
+        new_household = {name: str(data.get(name) or '').strip() for name in NEW_HOUSEHOLD_FIELDS}
+        if not new_household['new_household_no']:
+            raise ResidentValidationError('Household number is required when creating new household.')
+        return None, new_household
+    if household_select in (None, '', 'none'):
+        return None, {}
+    try:
+        household_id = int(household_select)
+    except (TypeError, ValueError):
+        household_id = None
+    if household_id is None or not (household_id in existing if existing is not None
+                                    else db.session.get(Household, household_id)):
+        raise ResidentValidationError('The selected household does not exist.')
+    return household_id, {}
+
+def likely_duplicates(records, exclude_ids=()):
+    """Residents who are probably the same person as each of ``records``.
+
+    ``records`` are mappings of DEDUPE_FIELDS (validated form data, pending
+    submissions). Candidates are fetched with one query of indexed equality
+    lookups on the blocking keys, so the cost does not grow with the table.
+    A candidate is kept only if dedupe.likely_same accepts it: the first
+    names are close and the known dates of birth agree. Returns one list of
+    Residents per record.
+    """
+    keys = [dedupe.candidate_keys(*(record.get(f) for f in DEDUPE_FIELDS)) for record in records]
+    dob_keys = {key for dob, _ in keys for key in dob}
+    year_keys = {key for _, year in keys for key in year}
+    by_key = {}
+    if dob_keys or year_keys:
+        candidates = (Resident.query
+                      .filter(db.or_(Resident.dedupe_dob_key.in_(dob_keys), Resident.dedupe_year_key.in_(year_keys)))
+                      .order_by(Resident.id).all())
+        for resident in candidates:
+            if resident.id not in exclude_ids:
+                for key in (resident.dedupe_dob_key, resident.dedupe_year_key):
+                    if key:
+                        by_key.setdefault(key, []).append(resident)
+
+    matches = []
+    for record, (dob, year) in zip(records, keys):
+        found = {}
+        for key in (*dob, *year):
+            for resident in by_key.get(key, ()):
+                if dedupe.likely_same(record.get('first_name'), record.get('date_of_birth'),
+                                      resident.first_name, resident.date_of_birth):
+                    found[resident.id] = resident
+        matches.append(sorted(found.values(), key=lambda r: r.id))
+    return matches
+
+def duplicate_to_dict(resident):
+    return {
+        'id': resident.id,
+        'name': f'{resident.last_name}, {resident.first_name} {resident.middle_name}',
+        'age': resident.age,
+        'date_of_birth': resident.date_of_birth.isoformat() if resident.date_of_birth else None,
+        'purok': resident.purok,
+        'url': url_for('resident_info', id=resident.id),
+    }
+
+def duplicates_message(duplicates):
+    names = '; '.join(f'{r.last_name}, {r.first_name} (#{r.id}, {r.purok})' for r in duplicates[:3])
+    more = f' and {len(duplicates) - 3} more' if len(duplicates) > 3 else ''
+    return f'Possible duplicate of {names}{more}.'
+
+@app.route('/api/residents/duplicates')
+@query_budget(1)
+@login_required
+def api_resident_duplicates():
+    """Likely duplicates of the resident being entered, for the add/edit forms."""
+    record = {name: request.args.get(name, '').strip() for name in DEDUPE_FIELDS}
+    try:
+        record['date_of_birth'] = datetime.datetime.strptime(record['date_of_birth'], '%Y-%m-%d').date()
+    except ValueError:
+        record['date_of_birth'] = None
+    record['age'] = request.args.get('age', type=int)
+    exclude = request.args.get('exclude', type=int)
+    duplicates = likely_duplicates([record], exclude_ids={exclude})[0]
+    return jsonify(duplicates=[duplicate_to_dict(r) for r in duplicates])
+
+def add_resident_form(error=None, duplicates=()):
+    """The add_resident page; after a rejected POST it keeps what was typed and says why."""
+    household_choice = ''
+    choice = request.form.get('household_select', 'none')
+    if choice == 'new':
+        household_choice = '+ New household'
+    elif choice.isdigit():
+        household = db.session.get(Household, int(choice))
+        household_choice = household_label(household) if household else ''
+    return render_template('add_resident.html', form=request.form, error=error, duplicates=duplicates,
+                           household_choice=household_choice)
 
 @app.route('/add_resident', methods=['GET', 'POST'])
 @login_required  # Changed from @admin_required to @login_required
 def add_resident():
     if request.method == 'POST':
-        last_name = request.form.get('last_name', '').strip()
-        first_name = request.form.get('first_name', '').strip()
-        middle_name = request.form.get('middle_name', '').strip()
-        gender = request.form.get('gender')
-        age = request.form.get('age', '').strip()
-        purok = request.form.get('purok', '').strip()
-        voter_status = request.form.get('voter_status')
-        senior_citizen = request.form.get('senior_citizen')
-        date_of_birth_str = request.form.get('date_of_birth', '').strip()
-        place_of_birth = request.form.get('place_of_birth', '').strip()
-        civil_status = request.form.get('civil_status', '').strip()
-        citizenship = request.form.get('citizenship', '').strip()
-        occupation = request.form.get('occupation', '').strip()
         household_select = request.form.get('household_select')
 
-        if not (last_name and first_name and middle_name and gender and age and purok and voter_status and senior_citizen):
-            flash('Fill all required fields.', 'warning')
-            return redirect(url_for('add_resident'))
-
         try:
-            age = int(age)
-            if age < 0:
-                raise ValueError
-        except ValueError:
-            flash('Age must be positive.', 'warning')
-            return redirect(url_for('add_resident'))
+            fields = validate_resident_data(request.form)
+        except ResidentValidationError as e:
+            return add_resident_form(str(e))
 
-        dob = None
-        if date_of_birth_str:
-            try:
-                dob = datetime.datetime.strptime(date_of_birth_str, '%Y-%m-%d').date()
-            except ValueError:
-                flash('Invalid date format.', 'warning')
-                return redirect(url_for('add_resident'))
+        duplicates = likely_duplicates([fields])[0]
+        if duplicates and not request.form.get('confirm_duplicate'):
+            return add_resident_form(duplicates_message(duplicates) + ' Tick "Add anyway" if this is a different person.',
+                                     duplicates)
 
         # If user is admin, add directly to residents
         if current_user.role == 'admin':
@@ -346,13 +1406,11 @@ def add_resident():
                 new_purok_hh = request.form.get('new_purok', '').strip()
                 
                 if not new_household_no:
-                    flash('Household number is required when creating new household.', 'warning')
-                    return redirect(url_for('add_resident'))
+                    return add_resident_form('Household number is required when creating new household.')
                 
                 existing_household = Household.query.filter_by(household_no=new_household_no).first()
                 if existing_household:
-                    flash('Household number already exists.', 'warning')
-                    return redirect(url_for('add_resident'))
+                    return add_resident_form('Household number already exists.')
                 
                 new_household = Household(
                     household_no=new_household_no,
@@ -366,19 +1424,13 @@ def add_resident():
                 db.session.flush()
                 household_id = new_household.id
                 
-            elif household_select and household_select != 'none':
+            else:
                 try:
-                    household_id = int(household_select)
-                except (TypeError, ValueError):
-                    household_id = None
-
-            resident = Resident(
-                last_name=last_name, first_name=first_name, middle_name=middle_name,
-                gender=gender, age=age, purok=purok, voter_status=voter_status,
-                senior_citizen=senior_citizen, date_of_birth=dob, place_of_birth=place_of_birth or None,
-                civil_status=civil_status or None, citizenship=citizenship or None,
-                occupation=occupation or None, household_id=household_id
-            )
+                    household_id, _ = pending_household(request.form, household_select)
+                except ResidentValidationError as e:
+                    return add_resident_form(str(e))
+
+            resident = Resident(household_id=household_id, **fields)
             db.session.add(resident)
             db.session.commit()
             flash('Resident added successfully.', 'success')
@@ -386,89 +1438,237 @@ def add_resident():
         
         # If user is not admin, submit for approval
         else:
-            household_id = None
-            new_household_data = {}
-            
-            if household_select == 'new':
-                new_household_data = {
-                    'new_household_no': request.form.get('new_household_no', '').strip(),
-                    'new_region': request.form.get('new_region', '').strip(),
-                    'new_province': request.form.get('new_province', '').strip(),
-                    'new_city_municipality': request.form.get('new_city_municipality', '').strip(),
-                    'new_barangay': request.form.get('new_barangay', '').strip(),
-                    'new_purok': request.form.get('new_purok', '').strip()
-                }
-                
-                if not new_household_data['new_household_no']:
-                    flash('Household number is required when creating new household.', 'warning')
-                    return redirect(url_for('add_resident'))
-                    
-            elif household_select and household_select != 'none':
-                try:
-                    household_id = int(household_select)
-                except (TypeError, ValueError):
-                    household_id = None
-            
+            try:
+                household_id, new_household_data = pending_household(request.form, household_select)
+            except ResidentValidationError as e:
+                return add_resident_form(str(e))
+
             pending = PendingResident(
-                last_name=last_name, first_name=first_name, middle_name=middle_name,
-                gender=gender, age=age, purok=purok, voter_status=voter_status,
-                senior_citizen=senior_citizen, date_of_birth=dob, place_of_birth=place_of_birth or None,
-                civil_status=civil_status or None, citizenship=citizenship or None,
-                occupation=occupation or None, household_id=household_id,
-                submitted_by=current_user.id, status='pending',
-                **new_household_data
+                household_id=household_id, submitted_by=current_user.id, status='pending',
+                **fields, **new_household_data
             )
             db.session.add(pending)
             db.session.commit()
             flash('Resident submitted for approval. Admin will review shortly.', 'info')
             return redirect(url_for('pending_residents'))
 
-    households = Household.query.order_by(Household.household_no).all()
-    return render_template('add_resident.html', households=households)
+    return add_resident_form()
+
+PENDING_BATCH_MAX_RECORDS = 1000
+CLIENT_KEY_MAX_LENGTH = 100  # PendingResident.client_key
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+class BatchFormatError(ValueError):
+    pass
+
+def batch_records():
+    """Records of a batch upload: a JSON array (or {"records": [...]}) or NDJSON.
+
+    Returns (records, {index: error}). An NDJSON line that is not valid JSON
+    takes a None slot with its error in the map, so it gets its own result
+    instead of failing the batch.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        records, errors = [], {}
+        for number, line in enumerate(request.stream, 1):
+            if not line.strip():
+                continue
+            if len(records) == PENDING_BATCH_MAX_RECORDS:
+                raise BatchFormatError(f'At most {PENDING_BATCH_MAX_RECORDS} records per batch.')
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                errors[len(records)] = f'Line {number} is not valid JSON.'
+                records.append(None)
+        return records, errors
+
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get('records')
+    if not isinstance(body, list):
+        raise BatchFormatError('Send a JSON array of records (or {"records": [...]}), or NDJSON.')
+    if len(body) > PENDING_BATCH_MAX_RECORDS:
+        raise BatchFormatError(f'At most {PENDING_BATCH_MAX_RECORDS} records per batch.')
+    return body, {}
+
+def submit_pending_batch(records, submitted_by, errors=None):
+    """Validate ``records`` and insert the new ones as PendingResidents in one transaction.
+
+    A record's optional idempotency_key is stored as client_key; a key already
+    used by this submitter (earlier, or earlier in the same batch) is reported
+    as a duplicate of that submission instead of being inserted again.
+    ``errors`` maps the indexes of records that could not be parsed to their
+    error. Returns one result dict per record, in order.
+    """
+    def client_key(record):
+        key = record.get('idempotency_key') if isinstance(record, dict) else None
+        return str(key) if key not in (None, '') else None
+
+    def household_select(record):
+        return record.get('household_select') or (
+            'new' if record.get('new_household_no') else record.get('household_id'))
+
+    results, new, batch_keys = [], [], {}
+    keys = {key for key in map(client_key, records) if key and len(key) <= CLIENT_KEY_MAX_LENGTH}
+    household_ids = set()
+    for record in records:
+        if isinstance(record, dict):
+            try:
+                household_ids.add(int(household_select(record)))
+            except (TypeError, ValueError):
+                pass
+    if household_ids:
+        household_ids = set(db.session.scalars(db.select(Household.id).where(Household.id.in_(household_ids))))
+    existing = {}
+    if keys:
+        existing = {row.client_key: row for row in db.session.execute(
+            db.select(PendingResident.id, PendingResident.status, PendingResident.client_key)
+            .where(PendingResident.submitted_by == submitted_by, PendingResident.client_key.in_(keys)))}
+
+    for index, record in enumerate(records):
+        result = {'index': index}
+        results.append(result)
+        if errors and index in errors:
+            result.update(status='invalid', error=errors[index])
+            continue
+        if not isinstance(record, dict):
+            result.update(status='invalid', error='Record must be an object.')
+            continue
+        key = client_key(record)
+        result['idempotency_key'] = key
+        if key and len(key) > CLIENT_KEY_MAX_LENGTH:
+            # Not truncated: two long keys could then collide.
+            result.update(status='invalid', error=f'idempotency_key is longer than {CLIENT_KEY_MAX_LENGTH} characters.')
+            continue
+        if key in existing:
+            result.update(status='duplicate', id=existing[key].id, review_status=existing[key].status)
+            continue
+        if key in batch_keys:
+            result.update(status='duplicate', duplicate_of=batch_keys[key])
+            continue
+        try:
+            fields = validate_resident_data(record)
+            household_id, new_household = pending_household(record, household_select(record), household_ids)
+        except ResidentValidationError as e:
+            result.update(status='invalid', error=str(e))
+            continue
+        pending = PendingResident(household_id=household_id, submitted_by=submitted_by, status='pending',
+                                  client_key=key, **fields, **new_household)
+        new.append((pending, result))
+        if key:
+            batch_keys[key] = index
+
+    db.session.add_all(pending for pending, _ in new)
+    db.session.commit()
+    for pending, result in new:
+        result.update(status='created', id=pending.id, review_status=pending.status)
+    for result in results:
+        if 'duplicate_of' in result:
+            result.update(id=results[result.pop('duplicate_of')]['id'], review_status='pending')
+    return results
+
+@app.route('/api/pending_residents/batch', methods=['POST'])
+@login_required
+def api_submit_pending_batch():
+    """Submit many residents for approval at once, e.g. from a tablet coming back online.
+
+    Records use the add_resident field names, plus household_id or the
+    new_household_* fields, and an optional idempotency_key of at most
+    CLIENT_KEY_MAX_LENGTH characters. Retrying a batch is safe: records whose
+    key was already accepted come back as duplicates. A batch that still
+    conflicts after one retry gets a 409 and nothing is inserted.
+    """
+    try:
+        records, errors = batch_records()
+    except BatchFormatError as e:
+        return jsonify(error=str(e)), 400
+
+    try:
+        results = submit_pending_batch(records, current_user.id, errors)
+    except IntegrityError:
+        # A concurrent retry of the same batch inserted some keys first; the
+        # second pass reports those records as duplicates.
+        db.session.rollback()
+        try:
+            results = submit_pending_batch(records, current_user.id, errors)
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify(error='The batch conflicted with a concurrent submission; retry it.'), 409
+
+    counts = {status: sum(r['status'] == status for r in results) for status in ('created', 'duplicate', 'invalid')}
+    return jsonify(results=results, **counts)
 
 @app.route('/pending_residents')
+@query_budget(5)
 @login_required
 def pending_residents():
     if current_user.role == 'admin':
         # Admins see all pending residents
-        pending = PendingResident.query.filter_by(status='pending').order_by(PendingResident.submitted_at.desc()).all()
+        query = PendingResident.query.filter_by(status='pending')
     else:
         # Regular users see only their submissions
-        pending = PendingResident.query.filter_by(submitted_by=current_user.id).order_by(PendingResident.submitted_at.desc()).all()
-    
-    return render_template('pending_residents.html', pending_residents=pending)
+        query = PendingResident.query.filter_by(submitted_by=current_user.id)
 
+    # The template shows submitter and reviewer names: load them in two IN
+    # queries instead of one Admin query per row.
+    pending = (query.options(db.selectinload(PendingResident.submitter),
+                             db.selectinload(PendingResident.reviewer))
+               .order_by(PendingResident.submitted_at.desc()).all())
 
-# New route: Approve/Reject pending resident (admin only)
-@app.route('/review_resident/<int:id>/<action>', methods=['POST'])
-@admin_required
-def review_resident(id, action):
-    pending = PendingResident.query.get_or_404(id)
+    # Likely duplicates of the submissions still awaiting review, in one query.
+    waiting = [p for p in pending if p.status == 'pending']
+    duplicates = dict(zip((p.id for p in waiting), likely_duplicates([pending_fields(p) for p in waiting])))
     
-    if action == 'approve':
-        # Create household if needed
-        household_id = pending.household_id
-        
-        if pending.new_household_no:
-            # Check if household already exists
-            existing = Household.query.filter_by(household_no=pending.new_household_no).first()
-            if existing:
-                household_id = existing.id
-            else:
-                new_household = Household(
-                    household_no=pending.new_household_no,
+    return render_template('pending_residents.html', pending_residents=pending, duplicates=duplicates)
+
+def pending_fields(pending):
+    return {name: getattr(pending, name) for name in DEDUPE_FIELDS}
+
+
+def approve_pending_residents(pendings, reviewer_id):
+    """Turn PendingResident rows into Residents in the caller's transaction.
+
+    All new_household_no values are resolved with one IN query; missing
+    households are created together (duplicates within the batch collapse
+    onto a single Household) and the residents are inserted in one flush.
+    Submissions whose chosen household has been deleted since are left
+    pending. Returns (residents, those skipped submissions).
+    """
+    chosen_ids = {p.household_id for p in pendings if p.household_id and not p.new_household_no}
+    if chosen_ids:
+        chosen_ids = set(db.session.scalars(db.select(Household.id).where(Household.id.in_(chosen_ids))))
+    orphaned = [p for p in pendings if p.household_id and not p.new_household_no and p.household_id not in chosen_ids]
+    pendings = [p for p in pendings if p not in orphaned]
+
+    household_nos = {p.new_household_no for p in pendings if p.new_household_no}
+    households = {}
+    if household_nos:
+        households = dict(db.session.execute(
+            db.select(Household.household_no, Household.id)
+            .where(Household.household_no.in_(household_nos))
+        ).all())
+        new_households = {}
+        for pending in pendings:
+            no = pending.new_household_no
+            if no and no not in households and no not in new_households:
+                new_households[no] = Household(
+                    household_no=no,
                     region=pending.new_region or None,
                     province=pending.new_province or None,
                     city_municipality=pending.new_city_municipality or None,
                     barangay=pending.new_barangay or None,
                     purok=pending.new_purok or None
                 )
-                db.session.add(new_household)
-                db.session.flush()
-                household_id = new_household.id
-        
-        # Create the resident
-        resident = Resident(
+        if new_households:
+            db.session.add_all(new_households.values())
+            db.session.flush()
+            households.update((no, h.id) for no, h in new_households.items())
+
+    now = datetime.datetime.utcnow()
+    residents = []
+    for pending in pendings:
+        household_id = households[pending.new_household_no] if pending.new_household_no else pending.household_id
+        residents.append(Resident(
             last_name=pending.last_name,
             first_name=pending.first_name,
             middle_name=pending.middle_name,
@@ -483,26 +1683,75 @@ def review_resident(id, action):
             citizenship=pending.citizenship,
             occupation=pending.occupation,
             household_id=household_id
-        )
-        db.session.add(resident)
-        
-        # Update pending record
+        ))
         pending.status = 'approved'
-        pending.reviewed_by = current_user.id
-        pending.reviewed_at = datetime.datetime.utcnow()
-        
+        pending.reviewed_by = reviewer_id
+        pending.reviewed_at = now
+    db.session.add_all(residents)
+    return residents, orphaned
+
+def reject_pending_residents(pendings, reviewer_id):
+    now = datetime.datetime.utcnow()
+    for pending in pendings:
+        pending.status = 'rejected'
+        pending.reviewed_by = reviewer_id
+        pending.reviewed_at = now
+
+# New route: Approve/Reject pending resident (admin only)
+@app.route('/review_resident/<int:id>/<action>', methods=['POST'])
+@admin_required
+def review_resident(id, action):
+    pending = PendingResident.query.get_or_404(id)
+    
+    if action == 'approve':
+        duplicates = likely_duplicates([pending_fields(pending)])[0]
+        if duplicates and not request.form.get('confirm_duplicate'):
+            flash(duplicates_message(duplicates) + ' Confirm the approval if this is a different person.', 'warning')
+            return redirect(url_for('pending_residents'))
+        _, orphaned = approve_pending_residents([pending], current_user.id)
+        if orphaned:
+            flash('The household chosen for this submission no longer exists.', 'warning')
+            return redirect(url_for('pending_residents'))
         db.session.commit()
         flash('Resident approved and added to the system.', 'success')
         
     elif action == 'reject':
-        pending.status = 'rejected'
-        pending.reviewed_by = current_user.id
-        pending.reviewed_at = datetime.datetime.utcnow()
+        reject_pending_residents([pending], current_user.id)
         db.session.commit()
         flash('Resident submission rejected.', 'info')
     
     return redirect(url_for('pending_residents'))
 
+@app.route('/review_residents', methods=['POST'])
+@admin_required
+def review_residents():
+    action = request.form.get('action')
+    ids = {int(i) for i in request.form.getlist('ids') if i.isdigit()}
+    if action not in ('approve', 'reject') or not ids:
+        flash('Select at least one submission and an action.', 'warning')
+        return redirect(url_for('pending_residents'))
+
+    pendings = (PendingResident.query
+                .filter(PendingResident.id.in_(ids), PendingResident.status == 'pending')
+                .order_by(PendingResident.submitted_at).all())
+    if action == 'approve':
+        # Likely duplicates need a look of their own: approve them one at a time.
+        flagged = {p.id for p, duplicates in zip(pendings, likely_duplicates([pending_fields(p) for p in pendings]))
+                   if duplicates}
+        pendings = [p for p in pendings if p.id not in flagged]
+        residents, orphaned = approve_pending_residents(pendings, current_user.id)
+        db.session.commit()
+        flash(f'{len(residents)} residents approved and added to the system.', 'success')
+        if flagged:
+            flash(f'{len(flagged)} possible duplicates were skipped; review them individually.', 'warning')
+        if orphaned:
+            flash(f'{len(orphaned)} submissions were skipped because their household no longer exists.', 'warning')
+    else:
+        reject_pending_residents(pendings, current_user.id)
+        db.session.commit()
+        flash(f'{len(pendings)} submissions rejected.', 'info')
+    return redirect(url_for('pending_residents'))
+
 
 @app.route('/edit_resident/<int:id>', methods=['GET', 'POST'])
 @admin_required
@@ -570,20 +1819,18 @@ def edit_resident(id):
             db.session.flush()
             resident.household_id = new_household.id
             
-        elif household_select and household_select != 'none':
-            try:
-                resident.household_id = int(household_select)
-            except (TypeError, ValueError):
-                resident.household_id = None
         else:
-            resident.household_id = None
+            try:
+                resident.household_id, _ = pending_household(request.form, household_select)
+            except ResidentValidationError as e:
+                flash(str(e), 'warning')
+                return redirect(url_for('edit_resident', id=id))
 
         db.session.commit()
         flash('Resident updated successfully.', 'success')
         return redirect(url_for('residents'))
 
-    households = Household.query.order_by(Household.household_no).all()
-    return render_template('edit_resident.html', resident=resident, households=households)
+    return render_template('edit_resident.html', resident=resident)
 
 @app.route('/delete_resident/<int:id>', methods=['POST'])
 @admin_required
@@ -595,20 +1842,394 @@ def delete_resident(id):
     return redirect(url_for('residents'))
 
 @app.route('/resident_info/<int:id>')
+@query_budget(2)
 @login_required
+@page_cache.cached('resident', 'household')
 def resident_info(id):
-    resident = Resident.query.get_or_404(id)
+    resident = Resident.query.options(db.joinedload(Resident.household)).filter_by(id=id).first_or_404()
     return render_template('resident_info.html', resident=resident)
 
 
+IMPORT_HOUSEHOLD_FIELDS = ('region', 'province', 'city_municipality', 'barangay')
+IMPORT_REPORT_DIR = os.path.join(app.instance_path, 'import_reports')
+
+def import_residents_csv(stream, errors=None, batch_size=2000, progress=None):
+    """Stream residents from a CSV file object into the database.
+
+    Rows go through validate_resident_data (the add_resident rules); rejected
+    rows are written to ``errors`` (a text file object) with their line number
+    and reason. A household_no column is upserted through an in-memory
+    household_no -> id map, and every ``batch_size`` rows are inserted with one
+    executemany per table and committed. Memory use is bounded by the batch,
+    not the file. ``progress(summary)`` is called after each committed batch.
+    Returns a summary dict.
+    """
+    reader = csv.DictReader(stream)
+    error_writer = None
+    if errors is not None:
+        error_writer = csv.writer(errors)
+        error_writer.writerow(['line', 'error'] + list(reader.fieldnames or []))
+
+    household_ids = dict(db.session.execute(db.select(Household.household_no, Household.id)).all())
+    summary = {'imported': 0, 'rejected': 0, 'households_created': 0}
+    batch = []
+
+    def flush_batch():
+        connection = db.session.connection()
+        new_households = {}
+        for _, household in batch:
+            if household and household['household_no'] not in household_ids:
+                new_households.setdefault(household['household_no'], household)
+        if new_households:
+            connection.execute(insert_ignore(connection, Household.__table__),
+                               [dict(h, created_at=datetime.datetime.utcnow()) for h in new_households.values()])
+            created = connection.execute(db.select(Household.__table__)
+                                         .where(Household.household_no.in_(list(new_households)))).mappings().all()
+            household_ids.update((h['household_no'], h['id']) for h in created)
+            record_changes(connection, [change_entry(Household.__table__, h) for h in created])
+            summary['households_created'] += len(created)
+
+        rows, delta, cube_delta = [], {}, {}
+        for fields, household in batch:
+            rows.append(dict(fields, **resident_blocking_keys(fields),
+                             household_id=household_ids[household['household_no']] if household else None))
+            values = tuple(fields.get(f) for f in TRACKED_FIELDS)
+            for key, value in population_contribution(*values[:len(STAT_FIELDS)]).items():
+                delta[key] = delta.get(key, 0) + value
+            cell = cube_cell(*values)
+            cube_delta[cell] = cube_delta.get(cell, 0) + 1
+        inserted = connection.execute(Resident.__table__.insert().returning(*Resident.__table__.c), rows)
+        record_changes(connection, [change_entry(Resident.__table__, r) for r in inserted.mappings()])
+        apply_population_delta(connection, delta)
+        apply_cube_delta(connection, cube_delta)
+        touch_page_cache(db.session, Resident.__table__.name, Household.__table__.name)
+        db.session.commit()
+        summary['imported'] += len(rows)
+        batch.clear()
+        if progress:
+            progress(summary)
+
+    for row in reader:
+        try:
+            fields = validate_resident_data(row)
+        except ResidentValidationError as e:
+            summary['rejected'] += 1
+            if error_writer:
+                error_writer.writerow([reader.line_num, str(e)] + [row.get(f, '') for f in reader.fieldnames])
+            continue
+
+        household = None
+        household_no = (row.get('household_no') or '').strip()
+        if household_no:
+            household = {'household_no': household_no,
+                         'purok': (row.get('household_purok') or '').strip() or None}
+            for name in IMPORT_HOUSEHOLD_FIELDS:
+                household[name] = (row.get(name) or '').strip() or None
+        batch.append((fields, household))
+        if len(batch) >= batch_size:
+            flush_batch()
+
+    if batch:
+        flush_batch()
+    return summary
+
+IMPORT_UPLOAD_DIR = os.path.join(app.instance_path, 'import_uploads')
+
+@job_queue.task('encode_photo')
+def encode_photo_job(job, key, original):
+    """Encode an uploaded official photo's variants (see image_pipeline)."""
+    path = os.path.join(UPLOAD_DIR, original)
+    if os.path.exists(path):  # an earlier attempt may have finished and removed it
+        image_pipeline.encode_variants(UPLOAD_DIR, key, path)
+    # Pages cached before now point at the original, which encode_variants has
+    # removed; no row changed, so expire them here.
+    page_cache.bump({ElectedOfficial.__table__.name})
+    return {'key': key}
+
+@job_queue.task('import_residents', max_attempts=1)
+def import_residents_job(job, upload, report):
+    """Run an uploaded CSV through import_residents_csv on the worker.
+
+    A single attempt: batches are committed as they go, so a rerun would
+    import the first ones twice.
+    """
+    path = os.path.join(IMPORT_UPLOAD_DIR, upload)
+    total = os.path.getsize(path)
+    os.makedirs(IMPORT_REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(IMPORT_REPORT_DIR, report)
+    with open(path, 'rb') as raw, open(report_path, 'w', newline='', encoding='utf-8') as errors:
+        stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        summary = import_residents_csv(stream, errors, progress=lambda s: job.progress(
+            raw.tell(), total, f"Imported {s['imported']} residents, rejected {s['rejected']}."))
+    os.remove(path)
+    if not summary['rejected']:
+        os.remove(report_path)
+        report = None
+    return dict(summary, report=report)
+
+@app.route('/residents/import', methods=['GET', 'POST'])
+@admin_required
+def import_residents():
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not (file and file.filename):
+            flash('Choose a CSV file to import.', 'warning')
+            return redirect(url_for('import_residents'))
+
+        os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+        upload = f'{stamp}_{secure_filename(file.filename) or "residents.csv"}'
+        file.save(os.path.join(IMPORT_UPLOAD_DIR, upload))
+        job_id = job_queue.enqueue('import_residents', {'upload': upload, 'report': f'{stamp}_errors.csv'},
+                                   created_by=current_user.id)
+        db.session.commit()
+        flash('Import queued.', 'info')
+        return redirect(url_for('import_residents', job=job_id))
+
+    return render_template('import_residents.html', job_id=request.args.get('job', type=int),
+                           required_fields=RESIDENT_REQUIRED_FIELDS)
+
+@app.route('/residents/import/reports/<path:name>')
+@admin_required
+def import_report(name):
+    return send_from_directory(IMPORT_REPORT_DIR, secure_filename(name), as_attachment=True)
+
+
+EXPORT_BATCH_SIZE = 1000
+RESIDENT_EXPORT_COLUMNS = ('id', 'last_name', 'first_name', 'middle_name', 'gender', 'age', 'purok',
+                           'voter_status', 'senior_citizen', 'date_of_birth', 'place_of_birth',
+                           'civil_status', 'citizenship', 'occupation', 'household_id')
+HOUSEHOLD_EXPORT_COLUMNS = ('id', 'household_no', 'region', 'province', 'city_municipality',
+                            'barangay', 'purok', 'created_at')
+
+def resident_export_query(args):
+    resident, household = Resident.__table__, Household.__table__
+    columns = [resident.c[name] for name in RESIDENT_EXPORT_COLUMNS]
+    query = db.select(*columns)
+    if args.get('include_household'):
+        columns = [household.c[name].label(name if name.startswith('household') else f'household_{name}')
+                   for name in HOUSEHOLD_EXPORT_COLUMNS[1:-1]]
+        query = query.add_columns(*columns).outerjoin(household, resident.c.household_id == household.c.id)
+    for name in ('purok', 'voter_status', 'senior_citizen'):
+        if args.get(name):
+            query = query.where(resident.c[name] == args[name])
+    if args.get('household_id', type=int):
+        query = query.where(resident.c.household_id == args.get('household_id', type=int))
+    return query.order_by(resident.c.id)
+
+def household_export_query(args):
+    household = Household.__table__
+    # The household list's filters, so an export matches the list it was started from.
+    query = db.select(*[household.c[name] for name in HOUSEHOLD_EXPORT_COLUMNS]).where(*household_filters(args))
+    return query.order_by(household.c.household_no)
+
+def stream_query(query):
+    """Yield the header then every row, fetching EXPORT_BATCH_SIZE rows at a time."""
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    yield list(result.keys())
+    for partition in result.partitions():
+        yield from partition
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def xlsx_chunks(rows, title):
+    # Unlike the CSV export this does not stream: an .xlsx is a zip whose
+    # directory is written last, so the client receives nothing (headers
+    # included) until the whole workbook is built. openpyxl's write-only mode
+    # keeps memory flat by spilling rows to a temp file; the finished file is
+    # then sent from disk in fixed-size chunks. Point large exports at CSV.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    for row in rows:
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while chunk := spool.read(64 * 1024):
+            yield chunk
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def export_response(query, name, fmt):
+    if fmt not in EXPORT_MIMETYPES:
+        abort(404)
+    rows = stream_query(query)
+    chunks = csv_chunks(rows) if fmt == 'csv' else xlsx_chunks(rows, name)
+    filename = f"{name}_{datetime.date.today().isoformat()}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/export/residents.<fmt>')
+@admin_required
+def export_residents(fmt):
+    return export_response(resident_export_query(request.args), 'residents', fmt)
+
+@app.route('/export/households.<fmt>')
+@admin_required
+def export_households(fmt):
+    return export_response(household_export_query(request.args), 'households', fmt)
+
+
+def prefix_match(column, prefix):
+    # A half-open range instead of LIKE so an index on ``column`` is used.
+    return db.and_(column >= prefix, column < prefix + '\U0010ffff')
+
+def household_filters(args):
+    filters = []
+    for name in ('barangay', 'purok'):
+        if args.get(name, '').strip():
+            filters.append(getattr(Household, name) == args[name].strip())
+    prefix = args.get('household_no', '').strip()
+    if prefix:
+        filters.append(prefix_match(Household.household_no, prefix))
+    return filters
+
+def household_page(filters, after=None, before=None, limit=30):
+    """One page of households with member count and head of household.
+
+    The page of household ids is picked first (keyset on household_no), then
+    joined once to a members subquery restricted to those ids whose window
+    functions give both the member count and the head of household (taken as
+    the eldest member, lowest id on ties). Returns (rows, next_cursor,
+    prev_cursor); each row has .Household, .member_count and .head_* fields.
+    """
+    page = db.select(Household.id).where(*filters)
+    if before:
+        page = page.where(Household.household_no < before[0]).order_by(Household.household_no.desc())
+    else:
+        if after:
+            page = page.where(Household.household_no > after[0])
+        page = page.order_by(Household.household_no)
+    page = page.limit(limit + 1).subquery()
+
+    members = db.select(
+        Resident.household_id,
+        Resident.id.label('head_id'),
+        Resident.first_name.label('head_first_name'),
+        Resident.last_name.label('head_last_name'),
+        db.func.count().over(partition_by=Resident.household_id).label('member_count'),
+        db.func.row_number().over(partition_by=Resident.household_id,
+                                  order_by=(Resident.age.desc(), Resident.id)).label('rank'),
+    ).where(Resident.household_id.in_(db.select(page.c.id))).subquery()
+
+    query = (db.select(Household,
+                       db.func.coalesce(members.c.member_count, 0).label('member_count'),
+                       members.c.head_id, members.c.head_first_name, members.c.head_last_name)
+             .join(page, page.c.id == Household.id)
+             .outerjoin(members, db.and_(members.c.household_id == Household.id, members.c.rank == 1))
+             .order_by(Household.household_no.desc() if before else Household.household_no))
+    rows = db.session.execute(query).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+    cursor = lambda h: encode_cursor([h.household_no, h.id])
+    next_cursor = cursor(rows[-1].Household) if rows and has_next else None
+    prev_cursor = cursor(rows[0].Household) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def households_page_from_request():
+    return household_page(household_filters(request.args),
+                          after=decode_cursor(request.args.get('after')),
+                          before=decode_cursor(request.args.get('before')),
+                          limit=page_size_arg(app.config['HOUSEHOLDS_PAGE_SIZE']))
+
 @app.route('/household_list')
+@query_budget(3)
 @login_required
+@page_cache.cached('household', 'resident')
 def household_list():
-    households = Household.query.order_by(Household.household_no).all()
-    return render_template('household_list.html', households=households)
+    households, next_cursor, prev_cursor = households_page_from_request()
+    return render_template('household_list.html', households=households,
+                           next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+@app.route('/api/households')
+@query_budget(3)
+@login_required
+def api_households():
+    households, next_cursor, prev_cursor = households_page_from_request()
+    return jsonify(households=[{
+        'id': row.Household.id,
+        'household_no': row.Household.household_no,
+        'barangay': row.Household.barangay,
+        'purok': row.Household.purok,
+        'city_municipality': row.Household.city_municipality,
+        'member_count': row.member_count,
+        'head': {'id': row.head_id, 'first_name': row.head_first_name,
+                 'last_name': row.head_last_name} if row.head_id else None,
+    } for row in households], next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+HOUSEHOLD_LOOKUP_LIMIT = 10
+
+@app.template_global()
+def household_label(household):
+    place = ', '.join(p for p in (household.purok, household.barangay, household.city_municipality) if p)
+    return f'{household.household_no} — {place}' if place else household.household_no
+
+def household_lookup(q, limit=HOUSEHOLD_LOOKUP_LIMIT):
+    """Households whose number, barangay or purok starts with ``q``, ignoring case.
+
+    Each column is searched with its own LIMITed prefix range over lower(column),
+    through its HOUSEHOLD_LOOKUP_INDEXES expression index, and the branches
+    are combined in one UNION ALL. Number matches come first, then barangay,
+    then purok. The cost depends on ``limit``, not on the number of households.
+    """
+    columns = (Household.id, Household.household_no, Household.barangay,
+               Household.purok, Household.city_municipality)
+    if not q:
+        return db.session.execute(db.select(*columns).order_by(Household.household_no).limit(limit)).all()
+
+    branches = []
+    for rank, column in enumerate((Household.household_no, Household.barangay, Household.purok)):
+        folded = db.func.lower(column)
+        branch = (db.select(*columns, db.literal(rank).label('rank')).where(prefix_match(folded, q.lower()))
+                  .order_by(folded, Household.household_no).limit(limit).subquery())
+        branches.append(db.select(branch))
+    union = db.union_all(*branches).subquery()
+    rows, seen = [], set()
+    for row in db.session.execute(db.select(union).order_by(union.c.rank, union.c.household_no)):
+        if row.id not in seen and len(rows) < limit:
+            seen.add(row.id)
+            rows.append(row)
+    return rows
+
+@app.route('/api/households/lookup')
+@query_budget(1)
+@login_required
+@page_cache.cached('household')
+def api_household_lookup():
+    q = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', HOUSEHOLD_LOOKUP_LIMIT, type=int), 50))
+    return jsonify(q=q, households=[{
+        'id': row.id,
+        'household_no': row.household_no,
+        'barangay': row.barangay,
+        'purok': row.purok,
+        'label': household_label(row),
+    } for row in household_lookup(q, limit)])
 
 @app.route('/household/<int:id>')
+@query_budget(3)
 @login_required
+@page_cache.cached('household', 'resident')
 def household_detail(id):
     household = Household.query.get_or_404(id)
     members = household.members.order_by(Resident.last_name, Resident.first_name).all()
@@ -630,7 +2251,14 @@ def system_settings():
                 flash('Fill all password fields.', 'warning')
                 return redirect(url_for('system_settings'))
 
-            if not bcrypt.check_password_hash(current_user.password, current_pwd):
+            # current_user is a cached identity without the password hash.
+            admin = db.session.get(Admin, current_user.id)
+            try:
+                valid = password_hasher.check_password_hash(admin.password, current_pwd)
+            except HashingBusy:
+                flash('The server is busy. Please try again in a moment.', 'warning')
+                return redirect(url_for('system_settings'))
+            if not valid:
                 flash('Current password incorrect.', 'danger')
                 return redirect(url_for('system_settings'))
 
@@ -642,8 +2270,13 @@ def system_settings():
                 flash('Password must be 6+ characters.', 'warning')
                 return redirect(url_for('system_settings'))
 
-            current_user.password = bcrypt.generate_password_hash(new_pwd).decode('utf-8')
+            try:
+                admin.password = password_hasher.generate_password_hash(new_pwd)
+            except HashingBusy:
+                flash('The server is busy. Please try again in a moment.', 'warning')
+                return redirect(url_for('system_settings'))
             db.session.commit()
+            user_cache.invalidate(admin.id)
             flash('Password changed.', 'success')
             return redirect(url_for('system_settings'))
 
@@ -664,9 +2297,15 @@ def system_settings():
                 flash('Username exists.', 'danger')
                 return redirect(url_for('system_settings'))
 
-            user = Admin(username=username, password=bcrypt.generate_password_hash(password).decode('utf-8'), role=role)
+            try:
+                hashed = password_hasher.generate_password_hash(password)
+            except HashingBusy:
+                flash('The server is busy. Please try again in a moment.', 'warning')
+                return redirect(url_for('system_settings'))
+            user = Admin(username=username, password=hashed, role=role)
             db.session.add(user)
             db.session.commit()
+            user_cache.invalidate(user.id)
             flash(f'User "{username}" created.', 'success')
             return redirect(url_for('system_settings'))
 
@@ -682,11 +2321,235 @@ def delete_user(id):
 
     user = Admin.query.get_or_404(id)
     db.session.delete(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Foreign keys are enforced: submissions and events still reference this user.
+        db.session.rollback()
+        flash(f'User "{user.username}" has submissions or events and cannot be deleted.', 'warning')
+        return redirect(url_for('system_settings'))
+    user_cache.invalidate(id)
     flash(f'User "{user.username}" deleted.', 'success')
     return redirect(url_for('system_settings'))
 
 
+SENIOR_CITIZEN_AGE = 60
+
+def recompute_ages(today=None, batch_size=50000):
+    """Refresh age and senior_citizen from date_of_birth, as of ``today``.
+
+    Works through residents in id ranges of ``batch_size``, one transaction
+    each. Per range, one grouped SELECT collects the rows that will change
+    (for the population_stats and demographic_cube deltas) and one
+    UPDATE ... RETURNING with the same WHERE rewrites exactly those rows and
+    hands them to the change log. The stats row is
+    written first so the transaction holds the write lock and nothing can
+    change in between. Returns a summary dict.
+    """
+    today = today or datetime.date.today()
+    year, month_day = today.year, today.month * 100 + today.day
+    dob = Resident.date_of_birth
+    birthday_pending = (db.extract('month', dob) * 100 + db.extract('day', dob)) > month_day
+    new_age = year - db.extract('year', dob) - db.case((birthday_pending, 1), else_=0)
+    new_senior = db.case((new_age >= SENIOR_CITIZEN_AGE, 'Yes'), else_='No')
+    stale = db.and_(dob.isnot(None), dob <= today,
+                    db.or_(Resident.age.is_distinct_from(new_age),
+                           Resident.senior_citizen.is_distinct_from(new_senior)))
+
+    summary = {'checked': 0, 'updated': 0, 'senior_changes': 0}
+    with db.engine.connect() as connection:
+        low, high = connection.execute(db.select(db.func.min(Resident.id), db.func.max(Resident.id))
+                                       .where(dob.isnot(None))).one()
+        summary['checked'] = connection.execute(db.select(db.func.count()).where(dob.isnot(None))).scalar()
+    if low is None:
+        return summary
+
+    for start in range(low, high + 1, batch_size):
+        in_range = db.and_(Resident.id >= start, Resident.id < start + batch_size, stale)
+        with db.engine.begin() as connection:
+            apply_population_delta(connection, {}, touch=True)
+            groups = connection.execute(
+                db.select(*(getattr(Resident, f) for f in TRACKED_FIELDS), new_age, new_senior, db.func.count())
+                .where(in_range)
+                .group_by(*(getattr(Resident, f) for f in TRACKED_FIELDS), new_age, new_senior)).all()
+            if not groups:
+                continue
+            delta, cube_delta = {}, {}
+            senior_index = TRACKED_FIELDS.index('senior_citizen')
+            for *old, age, senior, count in groups:
+                new = dict(zip(TRACKED_FIELDS, old), age=int(age), senior_citizen=senior)
+                for sign, values in ((-1, old), (1, [new[f] for f in TRACKED_FIELDS])):
+                    for key, value in population_contribution(*values[:len(STAT_FIELDS)]).items():
+                        delta[key] = delta.get(key, 0) + sign * value * count
+                    cell = cube_cell(*values)
+                    cube_delta[cell] = cube_delta.get(cell, 0) + sign * count
+                if senior != old[senior_index]:
+                    summary['senior_changes'] += count
+            updated = connection.execute(Resident.__table__.update().where(in_range)
+                                         .values(age=new_age, senior_citizen=new_senior)
+                                         .returning(*Resident.__table__.c)).mappings().all()
+            apply_population_delta(connection, delta)
+            apply_cube_delta(connection, cube_delta)
+            record_changes(connection, [change_entry(Resident.__table__, row) for row in updated])
+            summary['updated'] += len(updated)
+    if summary['updated']:
+        page_cache.bump({Resident.__table__.name})
+    return summary
+
+@app.cli.command('recompute-ages')
+@click.option('--today', type=click.DateTime(formats=['%Y-%m-%d']), help='Compute ages as of this date.')
+@click.option('--batch-size', default=50000, show_default=True, help='Resident ids per transaction.')
+def recompute_ages_command(today, batch_size):
+    """Recompute age and senior_citizen from date_of_birth (run nightly from cron)."""
+    today = today.date() if today else datetime.date.today()
+    start = datetime.datetime.utcnow()
+    summary = recompute_ages(today, batch_size=batch_size)
+    elapsed = (datetime.datetime.utcnow() - start).total_seconds()
+    print(f"Ages as of {today}: checked {summary['checked']} residents with a date of birth, "
+          f"updated {summary['updated']} ({summary['senior_changes']} senior status changes) in {elapsed:.2f}s.")
+
+
+DUPLICATE_SCAN_BATCH_SIZE = 20000
+
+def cluster_duplicate_residents(progress=None, batch_size=DUPLICATE_SCAN_BATCH_SIZE):
+    """Group the whole resident table into clusters of likely duplicates.
+
+    Two streamed scans, each in blocking-key index order, read one block of
+    residents at a time: a run of equal dob keys, then a run of year keys
+    with the same stem (name code, initial, purok). Within a block, residents
+    born within a year of each other are linked when dedupe.likely_same
+    accepts the pair. Each scan does work proportional to the table plus the
+    squares of its (small) blocks, so the job stays near-linear as the table
+    grows. ``progress(done, total)`` is called every ``batch_size`` rows.
+    Returns the clusters as lists of resident ids, largest first.
+    """
+    t = Resident.__table__
+    total = db.session.execute(db.select(db.func.count()).select_from(t)).scalar() * 2
+    clusters = dedupe.DisjointSet()
+    done = 0
+
+    def blocks(column, block_of):
+        # Yields lists of (year, id, first_name, date_of_birth) sharing block_of(key), sorted by year.
+        nonlocal done
+        query = (db.select(t.c.id, column, t.c.first_name, t.c.date_of_birth)
+                 .where(column.isnot(None)).order_by(column, t.c.id))
+        current, block = None, []
+        for id, key, first_name, dob in db.session.execute(query.execution_options(yield_per=batch_size)):
+            stem, year = block_of(key)
+            if stem != current:
+                yield sorted(block)
+                current, block = stem, []
+            block.append((year, id, first_name, dob))
+            done += 1
+            if progress and done % batch_size == 0:
+                progress(done, total)
+        yield sorted(block)
+
+    def link(block):
+        for i, (year, id, first_name, dob) in enumerate(block):
+            for other_year, other_id, other_first_name, other_dob in block[i + 1:]:
+                if other_year - year > 1:
+                    break
+                if dedupe.likely_same(first_name, dob, other_first_name, other_dob):
+                    clusters.union(id, other_id)
+
+    for block in blocks(t.c.dedupe_dob_key, lambda key: (key, 0)):
+        link(block)
+    for block in blocks(t.c.dedupe_year_key, dedupe.split_year_key):
+        link(block)
+    return clusters.groups()
+
+@job_queue.task('cluster_duplicates')
+def cluster_duplicates_job(job):
+    """Offline duplicate scan of the whole resident table; read-only, so safe to retry."""
+    clusters = cluster_duplicate_residents(progress=lambda done, total: job.progress(
+        done, total, f'Scanned {done // 2} of {total // 2} residents.'))
+    return {'clusters': clusters, 'duplicates': sum(len(c) for c in clusters)}
+
+@app.route('/api/residents/duplicates/scan', methods=['POST'])
+@admin_required
+def scan_duplicate_residents():
+    job_id = job_queue.enqueue('cluster_duplicates', created_by=current_user.id)
+    db.session.commit()
+    return jsonify(job_id=job_id, status_url=url_for('job_status', id=job_id)), 202
+
+@app.cli.command('find-duplicates')
+@click.option('--batch-size', default=DUPLICATE_SCAN_BATCH_SIZE, show_default=True, help='Rows fetched per round trip.')
+def find_duplicates_command(batch_size):
+    """List clusters of residents that are probably the same person."""
+    start = datetime.datetime.utcnow()
+    clusters = cluster_duplicate_residents(batch_size=batch_size)
+    elapsed = (datetime.datetime.utcnow() - start).total_seconds()
+    names = dict(db.session.execute(db.select(Resident.id, Resident.last_name + ', ' + Resident.first_name)
+                                    .where(Resident.id.in_([id for c in clusters[:50] for id in c]))).all())
+    for cluster in clusters[:50]:
+        print('  ' + '; '.join(f'#{id} {names.get(id, "")}' for id in cluster))
+    if len(clusters) > 50:
+        print(f'  ... and {len(clusters) - 50} more clusters')
+    print(f'Found {len(clusters)} clusters of likely duplicates '
+          f'({sum(len(c) for c in clusters)} residents) in {elapsed:.2f}s.')
+
+
+@app.cli.command('compact-changes')
+def compact_changes_command():
+    """Drop change-log entries that a later entry for the same row supersedes.
+
+    Safe at any time: a device syncing from any cursor still receives the
+    latest state (or tombstone) of every row changed after it.
+    """
+    log, later = ChangeLogEntry.__table__, ChangeLogEntry.__table__.alias('later')
+    start = datetime.datetime.utcnow()
+    newest = (db.select(db.func.max(later.c.seq))
+              .where(later.c.entity == log.c.entity, later.c.entity_id == log.c.entity_id)
+              .scalar_subquery())
+    removed = db.session.execute(log.delete().where(log.c.seq < newest)).rowcount
+    db.session.commit()
+    elapsed = (datetime.datetime.utcnow() - start).total_seconds()
+    print(f'Removed {removed} superseded change-log entries in {elapsed:.2f}s.')
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Rebuild population_stats and demographic_cube from the resident table."""
+    PopulationStats.__table__.create(db.engine, checkfirst=True)
+    DemographicCell.__table__.create(db.engine, checkfirst=True)
+    stats = rebuild_population_stats()
+    rebuild_demographic_cube(db.session.connection())
+    touch_page_cache(db.session, Resident.__table__.name)
+    db.session.commit()
+    print(f'population_stats and demographic_cube rebuilt: {stats.total_population} residents.')
+
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Create (if needed) and repopulate the resident_fts full-text index."""
+    with db.engine.begin() as connection:
+        rebuild_resident_fts(connection)
+    count = db.session.execute(db.text('SELECT count(*) FROM resident_fts')).scalar()
+    print(f'resident_fts rebuilt: {count} residents indexed.')
+
+
+@app.cli.command('import-residents')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='Write rejected rows here (default: <csv_path>.errors.csv).')
+@click.option('--batch-size', default=2000, show_default=True, help='Rows per transaction.')
+def import_residents_command(csv_path, errors_path, batch_size):
+    """Bulk-import residents (and their households) from a CSV file."""
+    errors_path = errors_path or csv_path + '.errors.csv'
+    start = datetime.datetime.utcnow()
+    with open(csv_path, newline='', encoding='utf-8-sig') as stream, \
+            open(errors_path, 'w', newline='', encoding='utf-8') as errors:
+        summary = import_residents_csv(stream, errors, batch_size=batch_size)
+    elapsed = (datetime.datetime.utcnow() - start).total_seconds()
+    print(f"Imported {summary['imported']} residents ({summary['households_created']} new households) "
+          f"in {elapsed:.1f}s; rejected {summary['rejected']}.")
+    if summary['rejected']:
+        print(f'Rejected rows written to {errors_path}')
+    else:
+        os.remove(errors_path)
+
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
@@ -0,0 +1,149 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask --app app build-assets`` copies static/css, static/js and
+static/images into static/dist. Each copy's name carries a hash of its
+content (css/main.css -> css/main.1a2b3c4d.css), and text assets also get
+.gz and .br variants. url() references inside CSS are rewritten to the
+fingerprinted names. manifest.json maps original to fingerprinted names.
+
+Templates link assets through asset_url('css/main.css'). When a manifest
+exists, that resolves to /assets/<fingerprinted name>, which is served with
+a one-year immutable Cache-Control and the best precompressed variant the
+client accepts. Without a build it falls back to the plain /static URL.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; gzip is still produced
+    brotli = None
+
+SOURCE_DIRS = ('images', 'css', 'js')  # images first so CSS can reference them
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+CACHE_FOREVER = 'public, max-age=31536000, immutable'
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def fingerprint(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{digest}{ext}'
+
+def rewrite_css_urls(name, css, manifest):
+    """Point url(...) references in ``css`` at their fingerprinted files."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        path, _, suffix = ref.partition('?')
+        target = posixpath.normpath(posixpath.join(base, path))
+        if target not in manifest:
+            return match.group(0)
+        new_ref = posixpath.relpath(manifest[target], base)
+        return f'url({quote}{new_ref}{"?" + suffix if suffix else ""}{quote})'
+
+    return CSS_URL_RE.sub(replace, css)
+
+def build_assets(static_folder):
+    """Rebuild static/dist and its manifest; return the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    staging = dist + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {}
+
+    for source_dir in SOURCE_DIRS:
+        root = os.path.join(static_folder, source_dir)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    content = f.read()
+                if name.endswith('.css'):
+                    content = rewrite_css_urls(name, content.decode('utf-8'), manifest).encode('utf-8')
+
+                hashed = fingerprint(name, content)
+                manifest[name] = hashed
+                target = os.path.join(staging, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(content)
+                if name.endswith(COMPRESSIBLE):
+                    with open(target + '.gz', 'wb') as f:
+                        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                    if brotli is not None:
+                        with open(target + '.br', 'wb') as f:
+                            f.write(brotli.compress(content, quality=11))
+
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(staging, dist)
+    return manifest
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def accepted_encodings():
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def init_assets(app):
+    manifest = load_manifest(app.static_folder)
+    dist = os.path.join(app.static_folder, DIST_DIR)
+
+    @app.template_global()
+    def asset_url(name):
+        if name in manifest:
+            return url_for('asset', filename=manifest[name])
+        return url_for('static', filename=name)
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        if filename.endswith(('.gz', '.br')) or filename == MANIFEST:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = accepted_encodings()
+        served, encoding = filename, None
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.exists(os.path.join(dist, filename + suffix)):
+                served, encoding = filename + suffix, coding
+                break
+        response = send_from_directory(dist, served, mimetype=mimetype, max_age=31536000)
+        response.headers['Cache-Control'] = CACHE_FOREVER
+        if filename.endswith(COMPRESSIBLE):
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress static assets into static/dist."""
+        manifest.clear()
+        manifest.update(build_assets(app.static_folder))
+        print(f'Built {len(manifest)} assets into {dist}'
+              + ('' if brotli else ' (brotli not installed: gzip only)'))
@@ -0,0 +1,109 @@
+"""Concurrency check: parallel writers against the real routes.
+
+Starts N worker processes (like gunicorn sync workers), each logging in as
+the admin and posting residents through /add_resident while also reading
+/dashboard and /residents. At the end it checks that every write landed,
+that none failed with "database is locked", and that population_stats and
+demographic_cube still match a full recount.
+
+    python bench/concurrent_writers.py --workers 8 --writes 50
+    python bench/concurrent_writers.py --no-tuning      # baseline without WAL/busy_timeout
+
+It uses a scratch SQLite file (or $DATABASE_URL if it is set), never
+instance/barangay.db.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def writer(worker_id, writes, results):
+    from app import app
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    ok = failed = 0
+    errors = []
+    for i in range(writes):
+        try:
+            r = client.post('/add_resident', data={
+                'last_name': f'Writer{worker_id}', 'first_name': f'Resident{i}', 'middle_name': 'C',
+                'gender': 'Male' if i % 2 else 'Female', 'age': str(20 + i % 60), 'purok': f'Purok {worker_id}',
+                'voter_status': 'Voter', 'senior_citizen': 'Yes' if i % 5 == 0 else 'No',
+                'household_select': 'new' if i % 10 == 0 else 'none',
+                'new_household_no': f'CW-{worker_id}-{i}',
+            })
+            if r.status_code == 302 and r.location.endswith('/residents'):
+                ok += 1
+            else:
+                failed += 1
+            client.get('/dashboard')
+            client.get('/residents')
+        except Exception as e:  # the point of the test is to surface these
+            failed += 1
+            errors.append(repr(e))
+    results.put((worker_id, ok, failed, errors[:3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel writers against /add_resident.')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=50, help='residents posted per worker')
+    parser.add_argument('--no-tuning', action='store_true', help='disable the SQLite PRAGMAs')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='barangay-concurrency-')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(scratch, 'concurrency.db'))
+    os.environ['SQLITE_TUNING'] = '0' if args.no_tuning else '1'
+
+    from setup_db import setup_database
+    setup_database(drop_first=True)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start = time.perf_counter()
+    procs = [ctx.Process(target=writer, args=(w, args.writes, results)) for w in range(args.workers)]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    from app import (app, db, Resident, DemographicCell, get_population_stats, compute_population_stats,
+                     rebuild_demographic_cube)
+    with app.app_context():
+        stored = db.session.query(Resident).filter(Resident.last_name.like('Writer%')).count()
+        stats = get_population_stats()
+        materialized = {k: getattr(stats, k) for k in compute_population_stats()}
+        recount = compute_population_stats()
+
+        def cube():
+            return set(db.session.execute(db.select(DemographicCell.__table__).where(DemographicCell.count > 0)).all())
+        cube_materialized = cube()
+        rebuild_demographic_cube(db.session.connection())
+        cube_recount = cube()
+        db.session.rollback()
+
+    ok = sum(o[1] for o in outcomes)
+    failed = sum(o[2] for o in outcomes)
+    expected = args.workers * args.writes
+    print(f'{args.workers} workers x {args.writes} writes in {elapsed:.1f}s '
+          f'({ok / elapsed:.0f} writes/s): {ok} ok, {failed} failed, {stored} stored')
+    for worker_id, _, _, errors in outcomes:
+        for error in errors:
+            print(f'  worker {worker_id}: {error}')
+    consistent = materialized == recount and cube_materialized == cube_recount
+    print('population_stats consistent with recount:', materialized == recount)
+    print('demographic_cube consistent with recount:', cube_materialized == cube_recount)
+    if failed or stored != expected or not consistent:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Deterministic synthetic data for benchmarks.
+
+Builds a scratch database with the given numbers of households, residents,
+pending submissions, officials and events. The same --seed always produces
+the same rows, so runs on different branches can be compared.
+
+    python bench/generate_data.py --households 5000 --residents-per-household 4
+    DATABASE_URL=sqlite:////tmp/bench.db python bench/generate_data.py --pending 500
+
+Without $DATABASE_URL it writes to a new temporary SQLite file and prints its
+URL, never to instance/barangay.db. Besides the admin (admin/admin123) it
+creates --staff encoders named staff1, staff2, ... with the password
+staff123.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAST_NAMES = ('Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres', 'Tomas',
+              'Andrada', 'Castillo', 'Flores', 'Villanueva', 'Ramos', 'Castro', 'Rivera', 'Aquino',
+              'Navarro', 'Salazar', 'Mercado', 'Dela Cruz', 'Del Rosario', 'Gonzales', 'Lopez',
+              'Hernandez', 'Perez', 'Aguilar', 'Manalo', 'Pascual', 'Dizon', 'Soriano', 'Valdez')
+FIRST_NAMES = {
+    'Male': ('Jose', 'Juan', 'Antonio', 'Andres', 'Pedro', 'Manuel', 'Ramon', 'Roberto', 'Eduardo',
+             'Miguel', 'Carlo', 'Mark', 'John Paul', 'Christian', 'Paolo', 'Rafael', 'Emilio'),
+    'Female': ('Maria', 'Ana', 'Rosa', 'Teresa', 'Carmen', 'Luz', 'Josefina', 'Cristina', 'Angelica',
+               'Kristine', 'Jasmine', 'Nicole', 'Patricia', 'Camille', 'Andrea', 'Bea', 'Liza'),
+}
+CIVIL_STATUSES = ('Single', 'Married', 'Widowed', 'Separated')
+OCCUPATIONS = (None, 'Farmer', 'Fisherman', 'Teacher', 'Driver', 'Vendor', 'Nurse', 'Student',
+               'Carpenter', 'Housekeeper', 'OFW', 'Barangay Tanod')
+EVENT_TITLES = ('Barangay Assembly', 'Clean-up Drive', 'Medical Mission', 'Vaccination Day',
+                'Feeding Program', 'Sports Fest', 'Council Session', 'Disaster Drill')
+
+BARANGAY = {'region': 'Region IV-A', 'province': 'Laguna', 'city_municipality': 'Calamba',
+            'barangay': 'San Isidro'}
+
+
+def person(rng, today, purok):
+    gender = rng.choice(('Male', 'Female'))
+    age = min(int(rng.expovariate(1 / 28)), 99)
+    dob = today - datetime.timedelta(days=age * 365 + rng.randrange(365))
+    return {
+        'last_name': rng.choice(LAST_NAMES),
+        'first_name': rng.choice(FIRST_NAMES[gender]),
+        'middle_name': rng.choice(LAST_NAMES),
+        'gender': gender,
+        'age': age,
+        'purok': purok,
+        'voter_status': 'Voter' if age >= 18 and rng.random() < 0.8 else 'Non-Voter',
+        'senior_citizen': 'Yes' if age >= 60 else 'No',
+        'date_of_birth': dob,
+        'place_of_birth': BARANGAY['city_municipality'],
+        'civil_status': rng.choice(CIVIL_STATUSES) if age >= 18 else 'Single',
+        'citizenship': 'Filipino',
+        'occupation': rng.choice(OCCUPATIONS) if age >= 18 else 'Student',
+    }
+
+
+def generate(households=1000, residents_per_household=4, pending=100, officials=8, events=60,
+             staff=5, puroks=7, seed=1, batch_size=5000):
+    """Reset the configured database and fill it; returns a summary dict."""
+    from setup_db import setup_database
+    from app import (app, db, bcrypt, Admin, Household, Resident, PendingResident, ElectedOfficial,
+                     BarangayEvent, rebuild_population_stats, rebuild_demographic_cube, seed_change_log,
+                     resident_blocking_keys, touch_page_cache)
+
+    rng = random.Random(seed)
+    today = datetime.date(2026, 1, 1)  # fixed, so ages and dates are reproducible
+    now = datetime.datetime(2026, 1, 1, 8, 0)
+    setup_database(drop_first=True)
+
+    with app.app_context():
+        connection = db.session.connection()
+        staff_hash = bcrypt.generate_password_hash('staff123').decode('utf-8')
+        connection.execute(Admin.__table__.insert(), [
+            {'username': f'staff{i}', 'password': staff_hash, 'role': 'user'} for i in range(1, staff + 1)])
+        admin_id = db.session.execute(db.select(Admin.id).filter_by(username='admin')).scalar_one()
+        staff_ids = db.session.execute(db.select(Admin.id).filter_by(role='user')).scalars().all() or [admin_id]
+
+        resident_count, household_ids = 0, []
+        for start in range(0, households, batch_size):
+            chunk = range(start, min(start + batch_size, households))
+            connection.execute(Household.__table__.insert(), [
+                dict(BARANGAY, household_no=f'HH-{n + 1:06d}', purok=f'Purok {n % puroks + 1}',
+                     created_at=now) for n in chunk])
+            ids = dict(db.session.execute(db.select(Household.household_no, Household.id)
+                                          .where(Household.household_no.in_([f'HH-{n + 1:06d}' for n in chunk]))).all())
+            household_ids.extend(ids[f'HH-{n + 1:06d}'] for n in chunk)
+            rows = []
+            for n in chunk:
+                purok = f'Purok {n % puroks + 1}'
+                members = max(1, round(rng.gauss(residents_per_household, 1.5)))
+                for _ in range(members):
+                    fields = person(rng, today, purok)
+                    rows.append(dict(fields, **resident_blocking_keys(fields, today),
+                                     household_id=ids[f'HH-{n + 1:06d}']))
+            connection.execute(Resident.__table__.insert(), rows)
+            resident_count += len(rows)
+
+        if pending:
+            rows = []
+            for i in range(pending):
+                fields = person(rng, today, f'Purok {rng.randrange(puroks) + 1}')
+                fields.update(dict.fromkeys(('household_id', 'new_household_no', 'new_purok')
+                                            + tuple('new_' + k for k in BARANGAY)))
+                if household_ids and rng.random() < 0.7:
+                    fields['household_id'] = rng.choice(household_ids)
+                else:
+                    fields.update(new_household_no=f'PN-{i + 1:06d}', new_purok=fields['purok'],
+                                  **{'new_' + k: v for k, v in BARANGAY.items()})
+                rows.append(dict(fields, submitted_by=rng.choice(staff_ids), status='pending',
+                                 submitted_at=now - datetime.timedelta(minutes=i)))
+            connection.execute(PendingResident.__table__.insert(), rows)
+
+        officials = min(officials, 8)
+        if officials:
+            connection.execute(ElectedOfficial.__table__.insert(), [
+                {'name': f'Hon. {rng.choice(FIRST_NAMES["Male"] + FIRST_NAMES["Female"])} {rng.choice(LAST_NAMES)}',
+                 'position': 'Chairman' if i == 0 else 'Kagawad', 'order': None if i == 0 else i,
+                 'created_at': now} for i in range(officials)])
+
+        if events:
+            connection.execute(BarangayEvent.__table__.insert(), [
+                {'title': rng.choice(EVENT_TITLES), 'description': None,
+                 'event_date': today + datetime.timedelta(days=rng.randrange(-180, 365)),
+                 'created_by': admin_id, 'created_at': now} for _ in range(events)])
+
+        rebuild_population_stats()
+        rebuild_demographic_cube(connection)
+        seed_change_log(connection)
+        touch_page_cache(db.session, *db.metadata.tables)
+        db.session.commit()
+
+    return {'households': households, 'residents': resident_count, 'pending': pending,
+            'officials': officials, 'events': events, 'staff': staff, 'seed': seed}
+
+
+def add_arguments(parser):
+    parser.add_argument('--households', type=int, default=1000)
+    parser.add_argument('--residents-per-household', type=float, default=4)
+    parser.add_argument('--pending', type=int, default=100)
+    parser.add_argument('--officials', type=int, default=8, help='at most 8 (1 chairman, 7 kagawad)')
+    parser.add_argument('--events', type=int, default=60)
+    parser.add_argument('--staff', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def generate_from_args(args):
+    return generate(households=args.households, residents_per_household=args.residents_per_household,
+                    pending=args.pending, officials=args.officials, events=args.events,
+                    staff=args.staff, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a scratch database with synthetic data.')
+    add_arguments(parser)
+    args = parser.parse_args()
+    if 'DATABASE_URL' not in os.environ:
+        scratch = tempfile.mkdtemp(prefix='barangay-bench-')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(scratch, 'bench.db')
+    start = time.perf_counter()
+    summary = generate_from_args(args)
+    print(f"{summary['households']} households, {summary['residents']} residents, {summary['pending']} pending, "
+          f"{summary['officials']} officials, {summary['events']} events in {time.perf_counter() - start:.1f}s")
+    print('DATABASE_URL=' + os.environ['DATABASE_URL'])
+
+
+if __name__ == '__main__':
+    main()
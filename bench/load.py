@@ -0,0 +1,273 @@
+"""Route-level load benchmark against the real app under gunicorn.
+
+Generates a deterministic dataset (bench/generate_data.py) in a scratch
+database, starts gunicorn on it, and runs --users virtual users for
+--duration seconds. User 0 is the admin and works through the approval flow
+(pending list, then approve). The others are staff who mix dashboard,
+resident search and household detail views. Every user also posts fresh
+logins now and then. For each route it reports p50/p95/p99 latency,
+throughput, errors and SQL statements per request (from the X-Query-Count
+header), and writes everything to a JSON file.
+
+    python bench/load.py --households 5000 --users 8 --duration 30 --output before.json
+    python bench/load.py --households 5000 --users 8 --duration 30 --compare before.json
+
+Set --db to reuse an existing database file instead of generating one.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_data import LAST_NAMES, add_arguments, generate_from_args  # noqa: E402
+
+STAFF_MIX = (('dashboard', 4), ('events_month', 2), ('residents_search', 4), ('household_detail', 4), ('login', 1))
+
+
+class Client:
+    """One virtual user: a cookie and a keep-alive connection."""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookie = None
+        self.conn = None
+
+    def request(self, method, path, form=None, keep_cookie=True):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie and keep_cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        if keep_cookie and response.getheader('Set-Cookie', '').startswith('session='):
+            self.cookie = response.getheader('Set-Cookie').split(';')[0]
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, route, seconds, response, ok_statuses=(200, 302)):
+        queries = response.getheader('X-Query-Count')
+        with self.lock:
+            entry = self.samples.setdefault(route, {'latency': [], 'queries': [], 'errors': 0, 'statuses': {}})
+            entry['latency'].append(seconds * 1000)
+            if queries is not None:
+                entry['queries'].append(int(queries))
+            if response.status not in ok_statuses:
+                entry['errors'] += 1
+            entry['statuses'][response.status] = entry['statuses'].get(response.status, 0) + 1
+
+
+def timed(recorder, route, call, *args, **kwargs):
+    start = time.perf_counter()
+    response = call(*args, **kwargs)
+    recorder.record(route, time.perf_counter() - start, response)
+    return response
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 2) if values else None
+
+
+def staff_user(index, args, stop, recorder, household_ids):
+    rng = random.Random(args.seed * 1000 + index)
+    client = Client(args.port)
+    username, password = f'staff{(index - 1) % args.staff + 1}', 'staff123'
+    timed(recorder, 'login', client.request, 'POST', '/login', {'username': username, 'password': password})
+    routes, weights = zip(*STAFF_MIX)
+    while not stop.is_set():
+        route = rng.choices(routes, weights)[0]
+        if route == 'dashboard':
+            timed(recorder, route, client.request, 'GET', '/dashboard')
+        elif route == 'events_month':
+            # What the dashboard calendar asks for when paging through the year.
+            month = rng.randint(1, 12)
+            last = (datetime.date(2026 + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)).day
+            timed(recorder, route, client.request, 'GET',
+                  f'/api/events?from=2026-{month:02d}-01&to=2026-{month:02d}-{last:02d}')
+        elif route == 'residents_search':
+            term = rng.choice(LAST_NAMES)[:rng.randint(3, 6)]
+            timed(recorder, route, client.request, 'GET', '/residents?' + urllib.parse.urlencode({'search': term}))
+        elif route == 'household_detail':
+            timed(recorder, route, client.request, 'GET', f'/household/{rng.choice(household_ids)}')
+        else:
+            timed(recorder, route, client.request, 'POST', '/login',
+                  {'username': username, 'password': password}, keep_cookie=False)
+
+
+def approver(args, stop, recorder, pending_ids):
+    client = Client(args.port)
+    timed(recorder, 'login', client.request, 'POST', '/login', {'username': 'admin', 'password': 'admin123'})
+    while not stop.is_set():
+        timed(recorder, 'pending_residents', client.request, 'GET', '/pending_residents')
+        if pending_ids:
+            timed(recorder, 'review_resident', client.request, 'POST', f'/review_resident/{pending_ids.pop()}/approve', {})
+        else:
+            time.sleep(0.05)
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, entry in sorted(recorder.samples.items()):
+        latency, queries = entry['latency'], entry['queries']
+        routes[route] = {
+            'requests': len(latency),
+            'errors': entry['errors'],
+            'statuses': {str(k): v for k, v in sorted(entry['statuses'].items())},
+            'throughput_rps': round(len(latency) / elapsed, 2),
+            'p50_ms': percentile(latency, 50),
+            'p95_ms': percentile(latency, 95),
+            'p99_ms': percentile(latency, 99),
+            'mean_ms': round(sum(latency) / len(latency), 2),
+            'sql_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            'sql_max': max(queries, default=None),
+        }
+    total = sum(r['requests'] for r in routes.values())
+    return routes, {'requests': total, 'errors': sum(r['errors'] for r in routes.values()),
+                    'throughput_rps': round(total / elapsed, 2)}
+
+
+def print_report(routes, totals, baseline=None):
+    print(f'{"route":<20}{"reqs":>7}{"err":>5}{"rps":>8}{"p50":>9}{"p95":>9}{"p99":>9}{"sql":>6}')
+    for route, r in routes.items():
+        line = (f'{route:<20}{r["requests"]:>7}{r["errors"]:>5}{r["throughput_rps"]:>8.1f}'
+                f'{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}{r["p99_ms"]:>9.1f}'
+                f'{r["sql_per_request"] if r["sql_per_request"] is not None else "-":>6}')
+        old = (baseline or {}).get(route)
+        if old and old.get('p95_ms'):
+            line += f'   p95 {100 * (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"]:+.0f}%'
+        print(line)
+    print(f'total: {totals["requests"]} requests, {totals["errors"]} errors, {totals["throughput_rps"]:.1f} req/s')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_gunicorn(args, env):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{args.port}',
+         '-w', str(args.workers), '-k', 'gthread', '--threads', str(args.threads), '--log-level', 'warning'],
+        cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit('gunicorn exited during startup')
+        try:
+            Client(args.port).request('GET', '/login')
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit('gunicorn did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load benchmark against gunicorn.')
+    add_arguments(parser)
+    parser.add_argument('--db', help='existing SQLite file to use instead of generating one')
+    parser.add_argument('--users', type=int, default=8, help='virtual users (user 0 approves)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--no-page-cache', action='store_true')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results JSON to compare p95 against')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='barangay-load-')
+    os.environ['PAGE_CACHE_PATH'] = os.path.join(scratch, 'page_cache.db')
+    if args.db:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.db)
+        dataset = {'db': os.path.abspath(args.db)}
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(scratch, 'load.db')
+        dataset = generate_from_args(args)
+
+    from app import app, db, Household, PendingResident
+    with app.app_context():
+        household_ids = db.session.execute(db.select(Household.id)).scalars().all()
+        pending_ids = db.session.execute(db.select(PendingResident.id).filter_by(status='pending')
+                                         .order_by(PendingResident.id.desc())).scalars().all()
+        db.engine.dispose()
+
+    env = dict(os.environ, QUERY_BUDGET_ENABLED='1', PAGE_CACHE_ENABLED='0' if args.no_page_cache else '1')
+    proc = start_gunicorn(args, env)
+    recorder, stop = Recorder(), threading.Event()
+    users = [threading.Thread(target=approver, args=(args, stop, recorder, pending_ids))]
+    users += [threading.Thread(target=staff_user, args=(i, args, stop, recorder, household_ids))
+              for i in range(1, args.users)]
+    try:
+        start = time.perf_counter()
+        for user in users:
+            user.start()
+        time.sleep(args.duration)
+        stop.set()
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    routes, totals = summarize(recorder, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['routes']
+    print_report(routes, totals, baseline)
+
+    result = {
+        'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'dataset': dataset,
+        'elapsed_s': round(elapsed, 2),
+        'totals': totals,
+        'routes': routes,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Load test: a login storm against gunicorn, with and without the hashing pool.
+
+For each mode it starts gunicorn on a scratch database. N client threads
+post /login in a loop (backing off briefly after a 503) while a separate,
+already logged-in client polls /dashboard, and the script reports login throughput (including 503 "try again"
+answers) and dashboard latency percentiles.
+
+    python bench/login_storm.py --logins 32 --seconds 15
+    python bench/login_storm.py --modes pool --hash-workers 2 --queue-depth 4
+
+Modes: "inline" hashes on the request thread (HASH_WORKERS=0, the old
+behaviour); "pool" uses the bounded process pool from hashing.py.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def login(port):
+    body = urllib.parse.urlencode({'username': 'admin', 'password': 'admin123'})
+    return request(port, 'POST', '/login', body)
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def wait_until_up(port, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit('gunicorn exited during startup')
+        try:
+            request(port, 'GET', '/login')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('gunicorn did not start')
+
+
+def run_mode(mode, args, env):
+    port = args.port
+    env = dict(env, HASH_WORKERS='0' if mode == 'inline' else str(args.hash_workers),
+               HASH_QUEUE_DEPTH=str(args.queue_depth))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{port}',
+         '-w', str(args.workers), '-k', 'gthread', '--threads', str(args.threads),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env)
+    try:
+        wait_until_up(port, proc)
+        cookie = login(port).getheader('Set-Cookie').split(';')[0]
+        stop = threading.Event()
+        outcomes = {'ok': 0, 'busy': 0, 'error': 0}
+        lock = threading.Lock()
+        dashboard = []
+
+        def storm():
+            while not stop.is_set():
+                try:
+                    status = login(port).status
+                    key = 'ok' if status == 302 else 'busy' if status == 503 else 'error'
+                except OSError:
+                    key = 'error'
+                with lock:
+                    outcomes[key] += 1
+                if key == 'busy':
+                    time.sleep(args.backoff)
+
+        def probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                status = request(port, 'GET', '/dashboard', cookie=cookie).status
+                if status == 200:
+                    dashboard.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=storm) for _ in range(args.logins)]
+        threads.append(threading.Thread(target=probe))
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f'{mode:>6}: logins {outcomes["ok"] / elapsed:6.1f}/s ok, '
+          f'{outcomes["busy"] / elapsed:6.1f}/s busy (503), {outcomes["error"]} errors | '
+          f'dashboard p50 {percentile(dashboard, 50):7.1f} ms, p95 {percentile(dashboard, 95):7.1f} ms, '
+          f'p99 {percentile(dashboard, 99):7.1f} ms, max {max(dashboard, default=float("nan")):7.1f} ms '
+          f'({len(dashboard)} samples)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login storm against gunicorn.')
+    parser.add_argument('--modes', nargs='+', default=['inline', 'pool'], choices=['inline', 'pool'])
+    parser.add_argument('--logins', type=int, default=32, help='concurrent login clients')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--hash-workers', type=int, default=1, help='hashing processes per gunicorn worker')
+    parser.add_argument('--queue-depth', type=int, default=4)
+    parser.add_argument('--backoff', type=float, default=0.5, help='seconds a client waits after a 503')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='barangay-login-storm-')
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(scratch, 'login_storm.db'))
+    os.environ['DATABASE_URL'] = env['DATABASE_URL']
+
+    from setup_db import setup_database
+    setup_database(drop_first=True)
+
+    for mode in args.modes:
+        run_mode(mode, args, env)
+
+
+if __name__ == '__main__':
+    main()
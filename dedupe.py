@@ -0,0 +1,169 @@
+"""Blocking keys for spotting residents who were registered twice.
+
+Comparing every new resident with every existing one does not scale, so each
+resident gets two cheap "blocking keys" that records of the same person
+almost always share, and only residents with a key in common are compared:
+
+    dob key    soundex(last name) + first initial + date of birth
+    year key   soundex(last name) + first initial + purok + birth year
+
+Before encoding, the last name is normalized: accents are folded, and
+spaces, hyphens and punctuation are dropped. So "Dela Cruz", "de la Cruz"
+and "Dela-Cruz" agree. Soundex then absorbs spelling variants such as
+Gonzales and Gonzalez. Without a date of birth the birth year is estimated
+from the age, which can be a year off, so lookups also try the neighbouring
+years (the year comes last in the key for that reason: sorted keys put
+neighbouring years next to each other).
+
+Sharing a key only makes two residents candidates; the initial says little
+on its own (Juan and Jose Cruz, born the same year in the same purok, share
+a year key). A candidate counts as a likely duplicate only when the first
+names are also close (see similar_first_names) and the dates of birth, when
+both are known, agree.
+"""
+import datetime
+import re
+import unicodedata
+
+# Least normalized edit-distance similarity of two first names of one person:
+# Jon/John, Mark/Marc and Jaun/Juan pass, Juan/Jose and Ana/Ava do not.
+FIRST_NAME_SIMILARITY = 0.75
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+
+
+def normalize_name(name):
+    """Lowercase ASCII letters and digits only: 'Dela Cruz-Ñoño' -> 'delacruznono'."""
+    folded = unicodedata.normalize('NFKD', str(name or ''))
+    return re.sub(r'[^a-z0-9]', '', ''.join(c for c in folded if not unicodedata.combining(c)).lower())
+
+
+def soundex(name):
+    """American Soundex of a normalized name ('' when it has no letters)."""
+    letters = [c for c in normalize_name(name) if c.isalpha()]
+    if not letters:
+        return ''
+    code, previous = letters[0].upper(), SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+        if letter not in 'hw':  # h and w do not separate letters with the same code
+            previous = digit
+    return (code + '000')[:4]
+
+
+def birth_year(date_of_birth, age, today=None):
+    if date_of_birth:
+        return date_of_birth.year
+    try:
+        return (today or datetime.date.today()).year - int(age)
+    except (TypeError, ValueError):
+        return None
+
+
+def name_prefix(last_name, first_name):
+    code, initial = soundex(last_name), normalize_name(first_name)[:1]
+    return f'{code}{initial}' if code and initial else None
+
+
+def blocking_keys(last_name, first_name, date_of_birth, age, purok, today=None):
+    """(dob key or None, year key or None) for one resident."""
+    prefix = name_prefix(last_name, first_name)
+    if not prefix:
+        return None, None
+    year = birth_year(date_of_birth, age, today)
+    return (f'{prefix}:{date_of_birth.isoformat()}' if date_of_birth else None,
+            f'{prefix}:{normalize_name(purok)}:{year}' if year is not None else None)
+
+
+def candidate_keys(last_name, first_name, date_of_birth, age, purok, today=None):
+    """The dob keys and year keys under which a duplicate of this resident may be stored."""
+    dob_key, year_key = blocking_keys(last_name, first_name, date_of_birth, age, purok, today)
+    year_keys = []
+    if year_key:
+        stem, year = year_key.rsplit(':', 1)
+        year_keys = [f'{stem}:{int(year) + offset}' for offset in (-1, 0, 1)]
+    return [dob_key] if dob_key else [], year_keys
+
+
+def split_year_key(year_key):
+    stem, year = year_key.rsplit(':', 1)
+    return stem, int(year)
+
+
+def compatible(dob_a, dob_b):
+    """Two records sharing a key stay candidates unless both dates of birth are known and differ."""
+    return not (dob_a and dob_b and dob_a != dob_b)
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance, two rows at a time.
+
+    Levenshtein plus swaps of adjacent letters, the commonest typing slip:
+    "Jaun" is one edit from "Juan", not two.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        before, previous = previous, current
+    return previous[-1]
+
+
+def similar_first_names(a, b):
+    """Whether two first names can belong to one person.
+
+    Either the whole names are within FIRST_NAME_SIMILARITY (1 - distance /
+    longer length, after normalize_name), or the first given names match, so
+    that "Juan" and "Juan Carlos" agree.
+    """
+    words_a, words_b = str(a or '').split(), str(b or '').split()
+    if words_a and words_b and normalize_name(words_a[0]) == normalize_name(words_b[0]):
+        return True
+    a, b = normalize_name(a), normalize_name(b)
+    if not a or not b:
+        return False
+    return 1 - edit_distance(a, b) / max(len(a), len(b)) >= FIRST_NAME_SIMILARITY
+
+
+def likely_same(first_a, dob_a, first_b, dob_b):
+    """The check applied to every pair of residents that share a blocking key."""
+    return compatible(dob_a, dob_b) and similar_first_names(first_a, first_b)
+
+
+class DisjointSet:
+    """Union-find over resident ids, with path halving and union by size."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size.get(a, 1) < self.size.get(b, 1):
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] = self.size.get(a, 1) + self.size.pop(b, 1)
+
+    def groups(self):
+        """Sets with more than one member, largest first."""
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]))
@@ -0,0 +1,135 @@
+"""Bounded process pool for bcrypt, so login storms cannot starve other requests.
+
+A bcrypt check takes hundreds of milliseconds of CPU. When many people log in
+at the same time, doing that on the request threads lets the hashes take the
+whole CPU while dashboard requests queue behind them. PasswordHasher sends the
+work to a small process pool instead (HASH_WORKERS processes per app process)
+and admits at most HASH_QUEUE_DEPTH hashes at once, counting running and
+waiting ones. Anything beyond that raises HashingBusy right away so the view
+can answer "try again" instead of waiting.
+
+HASH_WORKERS=0 hashes inline on the request thread with no limit, which is
+the old behaviour and the baseline for bench/login_storm.py.
+"""
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from db_config import env_int
+
+_bcrypt = None  # the Flask-Bcrypt instance, in pool processes
+
+log = logging.getLogger(__name__)
+
+
+class HashingBusy(RuntimeError):
+    pass
+
+
+def _init_worker(bcrypt):
+    global _bcrypt
+    _bcrypt = bcrypt
+
+
+def _check(pw_hash, password):
+    return _bcrypt.check_password_hash(pw_hash, password)
+
+
+def _generate(password):
+    return _bcrypt.generate_password_hash(password).decode('utf-8')
+
+
+class PasswordHasher:
+    def __init__(self, bcrypt, workers=2, queue_depth=8, timeout=10):
+        self.bcrypt = bcrypt
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max(queue_depth, 1))
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_pid = None
+        self.on_hash = None  # optional callback(operation, outcome, seconds), e.g. metrics
+
+    def executor(self):
+        # Created lazily and per process: a pool inherited through a fork
+        # (gunicorn --preload) belongs to the parent.
+        with self.lock:
+            if self.pool is None or self.pool_pid != os.getpid():
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.bcrypt,),
+                )
+                self.pool_pid = os.getpid()
+                # A multiprocessing child joins its own children before the usual
+                # atexit hooks run, and closes its queues at exitpriority 10; stop
+                # the pool before either or the process never exits.
+                multiprocessing.util.Finalize(self, self.shutdown, kwargs={'wait': True}, exitpriority=100)
+            return self.pool
+
+    def run(self, fn, *args):
+        if not self.workers:
+            _init_worker(self.bcrypt)
+            return fn(*args)
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy('password hashing queue is full')
+        try:
+            future = self.executor().submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy('password hashing timed out')
+        except BrokenProcessPool:
+            # A pool process died (or could not start); hash this one inline and
+            # start a fresh pool next time.
+            log.exception('password hashing pool failed, hashing inline')
+            self.shutdown()
+            _init_worker(self.bcrypt)
+            return fn(*args)
+
+    def timed(self, operation, fn, *args):
+        if self.on_hash is None:
+            return self.run(fn, *args)
+        start, outcome = time.perf_counter(), 'ok'
+        try:
+            return self.run(fn, *args)
+        except HashingBusy:
+            outcome = 'busy'
+            raise
+        finally:
+            self.on_hash(operation, outcome, time.perf_counter() - start)
+
+    def check_password_hash(self, pw_hash, password):
+        return self.timed('check', _check, pw_hash, password)
+
+    def generate_password_hash(self, password):
+        """Return a new bcrypt hash as a str."""
+        return self.timed('generate', _generate, password)
+
+    def shutdown(self, wait=False):
+        with self.lock:
+            if self.pool is not None and self.pool_pid == os.getpid():
+                self.pool.shutdown(wait=wait, cancel_futures=True)
+            self.pool = None
+
+
+def init_password_hasher(app, bcrypt):
+    workers = app.config.setdefault('HASH_WORKERS', env_int('HASH_WORKERS', min(2, os.cpu_count() or 1)))
+    return PasswordHasher(
+        bcrypt,
+        workers=workers,
+        queue_depth=app.config.setdefault('HASH_QUEUE_DEPTH', env_int('HASH_QUEUE_DEPTH', 4 * max(workers, 1))),
+        timeout=app.config.setdefault('HASH_TIMEOUT', env_int('HASH_TIMEOUT', 10)),
+    )
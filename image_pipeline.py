@@ -0,0 +1,143 @@
+"""Upload pipeline for elected-official photos.
+
+An upload is checked with Pillow (the real image type, not the extension)
+and named by the SHA-256 of its bytes. The original is written right away,
+and resized variants are then encoded in the background (by the caller's
+scheduler, e.g. a job queue, or else a thread pool) in WebP with a JPEG
+fallback:
+
+    <key>.<ext>          original, removed once the variants exist
+    <key>-thumb.webp     <key>-thumb.jpg
+    <key>-card.webp      <key>-card.jpg
+
+Because a file's name changes whenever its content does, variants can be
+served with far-future immutable cache headers. Files that no official
+references any more are removed by collect_garbage().
+"""
+import hashlib
+import io
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Pixel sizes match the .official-photo boxes (220x280 and smaller) at 2x.
+VARIANTS = {
+    'thumb': (160, 204),
+    'card': (440, 560),
+}
+ENCODINGS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+KEY_LENGTH = 24
+GC_GRACE_SECONDS = 600
+
+KEY_RE = re.compile(r'^[0-9a-f]{%d}$' % KEY_LENGTH)
+MANAGED_RE = re.compile(r'^([0-9a-f]{%d})(?:-\w+)?\.\w+$' % KEY_LENGTH)
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='photo-encode')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def is_content_key(name):
+    return bool(name and KEY_RE.match(name))
+
+def variant_name(key, size, ext):
+    return f'{key}-{size}.{ext}'
+
+def read_image(file_storage):
+    """Read an uploaded file and return (bytes, extension) if it is a real image."""
+    data = file_storage.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InvalidImage('Photo is too large (20 MB max).')
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            fmt = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImage('Photo is not a valid image.')
+    if fmt not in ALLOWED_FORMATS:
+        raise InvalidImage('Photo must be a JPEG, PNG, GIF or WebP image.')
+    return data, ALLOWED_FORMATS[fmt]
+
+def encode_variants(upload_dir, key, original_path):
+    with Image.open(original_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if image.mode == 'RGBA':
+            flat = Image.new('RGB', image.size, (255, 255, 255))
+            flat.paste(image, mask=image.getchannel('A'))
+            image = flat
+        for size, box in VARIANTS.items():
+            resized = ImageOps.fit(image, box, Image.LANCZOS)
+            for ext, fmt, options in ENCODINGS:
+                target = os.path.join(upload_dir, variant_name(key, size, ext))
+                tmp = target + '.tmp'
+                resized.save(tmp, fmt, **options)
+                os.replace(tmp, target)
+    os.remove(original_path)
+
+def save_photo(file_storage, upload_dir, schedule=None):
+    """Validate and store an upload; return its content key for photo_filename.
+
+    Variants are encoded in the background, so this returns as soon as the
+    original bytes are on disk. ``schedule(key, original_path)`` arranges
+    for encode_variants to run; by default it is submitted to ``executor``.
+    """
+    data, ext = read_image(file_storage)
+    key = hashlib.sha256(data).hexdigest()[:KEY_LENGTH]
+    if not os.path.exists(os.path.join(upload_dir, variant_name(key, 'card', 'jpg'))):
+        original_path = os.path.join(upload_dir, f'{key}.{ext}')
+        with open(original_path, 'wb') as f:
+            f.write(data)
+        if schedule:
+            schedule(key, original_path)
+        else:
+            executor.submit(encode_variants, upload_dir, key, original_path)
+    return key
+
+def photo_files(upload_dir, key, size):
+    """Return (webp, fallback) file names to show for ``key`` at ``size``.
+
+    While the variants are still encoding, both fall back to the original.
+    """
+    jpg = variant_name(key, size, 'jpg')
+    if os.path.exists(os.path.join(upload_dir, jpg)):
+        return variant_name(key, size, 'webp'), jpg
+    for ext in ALLOWED_FORMATS.values():
+        if os.path.exists(os.path.join(upload_dir, f'{key}.{ext}')):
+            return None, f'{key}.{ext}'
+    return None, None
+
+def collect_garbage(upload_dir, referenced):
+    """Delete files no official references.
+
+    ``referenced`` holds content keys and legacy file names. Files younger
+    than GC_GRACE_SECONDS are kept, so an upload whose official has not been
+    committed yet is never removed.
+    """
+    cutoff = time.time() - GC_GRACE_SECONDS
+    removed = 0
+    for name in os.listdir(upload_dir):
+        if name.startswith('.') or name == 'default.png':
+            continue
+        match = MANAGED_RE.match(name)
+        if (match.group(1) if match else name) in referenced:
+            continue
+        path = os.path.join(upload_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
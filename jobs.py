@@ -0,0 +1,196 @@
+"""Persistent background jobs, queued in the application database.
+
+A view enqueues a row in the jobs table (in the request's transaction, so
+the job exists only if the request's changes commit) and returns right away. A
+separate process, worker.py (the Procfile ``worker`` entry), claims jobs
+oldest first and runs the handler registered for the job's name:
+
+    @job_queue.task('import_residents', max_attempts=1)
+    def import_residents_job(job, path):
+        ...
+        job.progress(done, total, 'Imported 2000 rows')
+        return {'imported': 2000}    # stored as the job's JSON result
+
+Claiming is one UPDATE ... WHERE id = (oldest runnable job) RETURNING, so two
+workers never run the same job. A running job holds a lease (JOB_LEASE_SECONDS)
+that every progress report renews; when a worker dies, its job becomes
+runnable again once the lease runs out, or failed if that was its last
+attempt. A handler that raises is retried after
+JOB_RETRY_DELAY * 2**(attempt - 1) seconds until it has used max_attempts,
+then marked failed with the traceback.
+
+Progress is written on a connection of its own, so on SQLite call it after
+committing, not while the handler holds a write transaction.
+"""
+import datetime
+import json
+import logging
+import traceback
+
+from sqlalchemy import and_, or_, select
+
+from db_config import env_int
+
+log = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+def utcnow():
+    return datetime.datetime.utcnow()
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+class RunningJob:
+    """What a handler gets: the job's id, attempt number and a progress reporter."""
+
+    def __init__(self, queue, row, worker_id):
+        self.queue = queue
+        self.id = row.id
+        self.name = row.name
+        self.attempt = row.attempts
+        self.worker_id = worker_id
+
+    def progress(self, done, total=None, message=None):
+        fraction = min(1.0, done / total) if total else None
+        self.queue.report(self, fraction, message)
+
+
+class JobQueue:
+    def __init__(self, db, table, lease_seconds=300, retry_delay=10, poll_interval=1):
+        self.db = db
+        self.table = table
+        self.lease = datetime.timedelta(seconds=lease_seconds)
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.tasks = {}
+
+    def task(self, name, max_attempts=3):
+        """Register a handler, called as handler(job, **payload)."""
+        def register(fn):
+            self.tasks[name] = (fn, max_attempts)
+            return fn
+        return register
+
+    def enqueue(self, name, payload=None, created_by=None, max_attempts=None):
+        """Add a job to the current session's transaction; the caller commits. Returns its id."""
+        if name not in self.tasks:
+            raise UnknownTask(name)
+        now = utcnow()
+        result = self.db.session.execute(self.table.insert().values(
+            name=name, payload=json.dumps(payload or {}), status=QUEUED, progress=0.0,
+            attempts=0, max_attempts=max_attempts or self.tasks[name][1],
+            run_at=now, created_by=created_by, created_at=now))
+        return result.inserted_primary_key[0]
+
+    def get(self, job_id):
+        row = self.db.session.execute(select(self.table).where(self.table.c.id == job_id)).first()
+        return job_to_dict(row) if row else None
+
+    def claim(self, worker_id):
+        """Lease the oldest runnable job to ``worker_id``; None when there is nothing to do."""
+        t, now = self.table, utcnow()
+        expired = and_(t.c.status == RUNNING, t.c.locked_until < now)
+        runnable = or_(and_(t.c.status == QUEUED, t.c.run_at <= now),
+                       and_(expired, t.c.attempts < t.c.max_attempts))
+        oldest = select(t.c.id).where(runnable).order_by(t.c.run_at, t.c.id).limit(1).scalar_subquery()
+        with self.db.engine.begin() as connection:
+            # A job whose worker died on its last attempt is not run again: it
+            # may have committed part of its work (import_residents does).
+            connection.execute(
+                t.update().where(expired, t.c.attempts >= t.c.max_attempts)
+                .values(status=FAILED, error='Lease expired: the worker stopped during the last attempt.',
+                        finished_at=now, locked_until=None))
+            return connection.execute(
+                t.update().where(t.c.id == oldest).where(runnable)
+                .values(status=RUNNING, attempts=t.c.attempts + 1, locked_by=worker_id,
+                        locked_until=now + self.lease, started_at=now, error=None)
+                .returning(*t.c)).first()
+
+    def report(self, job, fraction, message):
+        t = self.table
+        values = {'locked_until': utcnow() + self.lease}
+        if fraction is not None:
+            values['progress'] = fraction
+        if message is not None:
+            values['message'] = str(message)[:255]
+        with self.db.engine.begin() as connection:
+            connection.execute(t.update().where(t.c.id == job.id, t.c.locked_by == job.worker_id).values(**values))
+
+    def run(self, row, worker_id):
+        """Run a claimed job and record its outcome."""
+        job = RunningJob(self, row, worker_id)
+        t = self.table
+        try:
+            if row.name not in self.tasks:
+                raise UnknownTask(row.name)
+            handler, _ = self.tasks[row.name]
+            result = handler(job, **json.loads(row.payload or '{}'))
+            values = {'status': SUCCEEDED, 'progress': 1.0, 'result': json.dumps(result),
+                      'finished_at': utcnow(), 'locked_until': None}
+        except Exception as e:
+            self.db.session.rollback()
+            error = traceback.format_exc()
+            if row.attempts < row.max_attempts and not isinstance(e, UnknownTask):
+                delay = self.retry_delay * 2 ** (row.attempts - 1)
+                log.warning('Job %s (%s) attempt %s failed; retrying in %ss', row.id, row.name, row.attempts, delay)
+                values = {'status': QUEUED, 'run_at': utcnow() + datetime.timedelta(seconds=delay),
+                          'error': error, 'locked_until': None}
+            else:
+                log.error('Job %s (%s) failed after %s attempts', row.id, row.name, row.attempts)
+                values = {'status': FAILED, 'error': error, 'finished_at': utcnow(), 'locked_until': None}
+        self.db.session.remove()
+        with self.db.engine.begin() as connection:
+            connection.execute(t.update().where(t.c.id == row.id, t.c.locked_by == worker_id).values(**values))
+        return values['status']
+
+    def work(self, worker_id, stop, burst=False):
+        """Claim and run jobs until ``stop`` (a threading.Event) is set.
+
+        With ``burst`` the loop also returns as soon as the queue is empty.
+        """
+        log.info('Worker %s started (%s)', worker_id, ', '.join(sorted(self.tasks)))
+        while not stop.is_set():
+            row = self.claim(worker_id)
+            if row is None:
+                if burst:
+                    break
+                stop.wait(self.poll_interval)
+                continue
+            log.info('Job %s (%s) attempt %s/%s', row.id, row.name, row.attempts, row.max_attempts)
+            self.run(row, worker_id)
+        log.info('Worker %s stopped', worker_id)
+
+
+def job_to_dict(row):
+    return {
+        'id': row.id,
+        'name': row.name,
+        'status': row.status,
+        'progress': row.progress,
+        'message': row.message,
+        'attempts': row.attempts,
+        'max_attempts': row.max_attempts,
+        'result': json.loads(row.result) if row.result else None,
+        # The last line of the traceback is the exception itself.
+        'error': row.error.strip().splitlines()[-1] if row.error else None,
+        'created_by': row.created_by,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'started_at': row.started_at.isoformat() if row.started_at else None,
+        'finished_at': row.finished_at.isoformat() if row.finished_at else None,
+        'next_attempt_at': row.run_at.isoformat() if row.status == QUEUED and row.run_at else None,
+    }
+
+
+def init_job_queue(app, db, table):
+    queue = JobQueue(
+        db, table,
+        lease_seconds=app.config.setdefault('JOB_LEASE_SECONDS', env_int('JOB_LEASE_SECONDS', 300)),
+        retry_delay=app.config.setdefault('JOB_RETRY_DELAY', env_int('JOB_RETRY_DELAY', 10)),
+        poll_interval=app.config.setdefault('JOB_POLL_INTERVAL', env_int('JOB_POLL_INTERVAL', 1)),
+    )
+    app.extensions['job_queue'] = queue
+    return queue
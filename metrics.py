@@ -0,0 +1,261 @@
+"""Request instrumentation: Server-Timing headers and Prometheus metrics.
+
+With METRICS_ENABLED=1 every request records its latency, its SQL statement
+count and time (through SQLAlchemy engine events), template render time and
+bcrypt time. It answers with a Server-Timing header, for example:
+
+    Server-Timing: app;dur=41.2, db;dur=6.3;desc="4 queries", tpl;dur=12.8
+
+and adds the numbers to per-route histograms and counters. /metrics serves
+them in the Prometheus text format to logged-in admins and to scrapers that
+send ``Authorization: Bearer $METRICS_TOKEN``. The client address is not
+trusted: behind a reverse proxy on the same host, every request would look
+local.
+
+Each process keeps its metrics in memory and a background thread writes them
+every METRICS_FLUSH_SECONDS to the process's own <pid>.json file in METRICS_DIR
+(instance/metrics by default). /metrics adds up the files of all live
+processes, so every gunicorn worker reports the totals of all workers. Files
+of dead workers are removed, which Prometheus treats as a counter reset.
+
+When METRICS_ENABLED is off (the default), none of the hooks are installed
+and there is no /metrics route.
+"""
+import hmac
+import json
+import os
+import threading
+import time
+
+from flask import Response, abort, before_render_template, g, has_request_context, request, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db_config import env_bool, env_int
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'barangay_'
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by route.'),
+    'sql_statements_total': ('counter', 'SQL statements executed, by route.'),
+    'sql_duration_seconds_total': ('counter', 'Time spent in SQL statements, by route.'),
+    'template_render_seconds': ('histogram', 'Jinja render time by template.'),
+    'bcrypt_seconds': ('histogram', 'Password hashing time, including time queued for the pool.'),
+}
+
+
+class Metrics:
+    def __init__(self, directory, flush_seconds=1):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flusher_pid = None
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f'{pid or os.getpid()}.json')
+
+    def start_flusher(self):
+        """Flush in a background thread of this process (started after any fork)."""
+        if self.flusher_pid == os.getpid():
+            return
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_seconds)
+                self.flush()
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def flush(self):
+        with self.lock:
+            data = {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, *entry] for (name, labels), entry in self.histograms.items()],
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path())
+
+    def collect(self):
+        """Sum the flushed metrics of every live process."""
+        self.flush()
+        counters, histograms = {}, {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            pid = int(filename[:-5])
+            if not pid_alive(pid):
+                try:
+                    os.remove(self.path(pid))
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(self.path(pid)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in data['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in data['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                entry = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+                entry[1] += total
+                entry[2] += count
+        return counters, histograms
+
+    def exposition(self):
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text) in HELP.items():
+            lines += [f'# HELP {PREFIX}{name} {help_text}', f'# TYPE {PREFIX}{name} {kind}']
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{PREFIX}{name}{format_labels(labels)} {value:g}')
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(BUCKETS, buckets):
+                    cumulative += n
+                    lines.append(f'{PREFIX}{name}_bucket{format_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+                lines.append(f'{PREFIX}{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{PREFIX}{name}_sum{format_labels(labels)} {total:.6f}')
+                lines.append(f'{PREFIX}{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def init_metrics(app, password_hasher=None):
+    enabled = app.config.setdefault('METRICS_ENABLED', env_bool('METRICS_ENABLED', False))
+    if not enabled:
+        return None
+
+    token = app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    metrics = Metrics(app.config.setdefault('METRICS_DIR', os.environ.get(
+                          'METRICS_DIR', os.path.join(app.instance_path, 'metrics'))),
+                      flush_seconds=env_int('METRICS_FLUSH_SECONDS', 1))
+
+    def timings():
+        return g.setdefault('timings', {'db': 0.0, 'queries': 0, 'tpl': 0.0, 'bcrypt': 0.0})
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _sql_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _sql_end(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context():
+            t = timings()
+            t['db'] += elapsed
+            t['queries'] += 1
+
+    @before_render_template.connect_via(app)
+    def _render_start(sender, template, context, **extra):
+        g.setdefault('render_starts', []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _render_end(sender, template, context, **extra):
+        starts = g.get('render_starts')
+        if starts:
+            elapsed = time.perf_counter() - starts.pop()
+            timings()['tpl'] += elapsed
+            metrics.observe('template_render_seconds', {'template': template.name or '?'}, elapsed)
+
+    def _hash_timed(operation, outcome, seconds):
+        if has_request_context():
+            timings()['bcrypt'] += seconds
+        metrics.observe('bcrypt_seconds', {'operation': operation, 'outcome': outcome}, seconds)
+
+    if password_hasher is not None:
+        password_hasher.on_hash = _hash_timed
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        t = timings()
+        route = request.endpoint or 'unmatched'
+        labels = {'route': route, 'method': request.method, 'status': str(response.status_code)}
+        metrics.observe('http_request_duration_seconds', labels, elapsed)
+        if t['queries']:
+            metrics.inc('sql_statements_total', {'route': route}, t['queries'])
+            metrics.inc('sql_duration_seconds_total', {'route': route}, t['db'])
+
+        parts = [f'app;dur={elapsed * 1000:.1f}', f'db;dur={t["db"] * 1000:.1f};desc="{t["queries"]} queries"']
+        if t['tpl']:
+            parts.append(f'tpl;dur={t["tpl"] * 1000:.1f}')
+        if t['bcrypt']:
+            parts.append(f'bcrypt;dur={t["bcrypt"] * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(parts)
+        metrics.start_flusher()
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        scraper = bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode())
+        if not (scraper or (current_user.is_authenticated and current_user.role == 'admin')):
+            abort(403)
+        return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+    app.extensions['metrics'] = metrics
+    return metrics
@@ -0,0 +1,281 @@
+"""Versioned, in-place schema migrations for the barangay database.
+
+    python migrate.py             create missing tables, then apply pending migrations
+    python migrate.py --status    list migrations and whether they are applied
+    python migrate.py --explain   print the query plan of every registered route query
+
+Each migration runs in its own transaction and is recorded in the
+schema_migrations table, so a live instance/barangay.db can be upgraded
+without setup_db.py's drop_all(). Migrations must be idempotent: fresh
+databases get the full schema from db.create_all() and then run every
+migration once to be stamped. The Procfile's release entry runs this script
+on every deploy.
+"""
+import argparse
+import datetime
+
+from sqlalchemy.schema import CreateIndex
+
+from app import (app, db, Admin, Resident, PendingResident, ElectedOfficial, BarangayEvent,
+                 Household, PopulationStats, DemographicCell, Job, ChangeLogEntry, rebuild_resident_fts,
+                 rebuild_demographic_cube, resident_blocking_keys, resident_match_queries, seed_change_log,
+                 seed_population_stats, DEDUPE_FIELDS, HOUSEHOLD_LOOKUP_INDEXES, RESIDENT_FTS_WEIGHTS)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def create_index(connection, index):
+    # IF NOT EXISTS rather than checkfirst: reflection skips expression indexes.
+    connection.execute(CreateIndex(index, if_not_exists=True))
+
+# Indexes over columns that a later migration adds; that migration creates them.
+LATER_INDEXES = {'ix_pending_resident_submitter_client_key',
+                 'ix_resident_dedupe_dob_key', 'ix_resident_dedupe_year_key',
+                 'ix_household_lower_household_no', 'ix_household_lower_barangay', 'ix_household_lower_purok'}
+
+def table_indexes(*models, names=None):
+    for model in models:
+        for index in model.__table__.indexes:
+            if (index.name in names) if names else (index.name not in LATER_INDEXES):
+                yield index
+
+
+@migration(1, 'Create population_stats (the dashboard fills the row on first read)')
+def create_population_stats(connection):
+    PopulationStats.__table__.create(connection, checkfirst=True)
+
+
+@migration(2, 'Create resident_fts full-text index and its sync triggers')
+def create_resident_search(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    rebuild_resident_fts(connection)
+
+
+@migration(3, 'Add indexes matching each route WHERE/ORDER BY')
+def add_route_indexes(connection):
+    for index in table_indexes(Resident, PendingResident, ElectedOfficial, BarangayEvent):
+        create_index(connection, index)
+
+
+@migration(4, 'Seed the population_stats row so concurrent writers never race to create it')
+def seed_population_stats_row(connection):
+    seed_population_stats(connection)
+
+
+@migration(5, 'Add household barangay/purok indexes for the filtered household list')
+def add_household_indexes(connection):
+    for index in table_indexes(Household):
+        create_index(connection, index)
+
+
+@migration(6, 'Create and fill demographic_cube (resident counts per purok/gender/age bracket/...)')
+def create_demographic_cube(connection):
+    DemographicCell.__table__.create(connection, checkfirst=True)
+    rebuild_demographic_cube(connection)
+
+
+@migration(7, 'Create the jobs table for the background worker')
+def create_jobs(connection):
+    Job.__table__.create(connection, checkfirst=True)
+
+
+@migration(8, 'Create change_log and record every current row, so devices can sync from 0')
+def create_change_log(connection):
+    ChangeLogEntry.__table__.create(connection, checkfirst=True)
+    seed_change_log(connection)
+
+
+@migration(9, 'Add pending_resident.client_key for idempotent batch submissions')
+def add_pending_client_key(connection):
+    if 'client_key' not in {c['name'] for c in db.inspect(connection).get_columns('pending_resident')}:
+        connection.execute(db.text('ALTER TABLE pending_resident ADD COLUMN client_key VARCHAR(100)'))
+    for index in table_indexes(PendingResident, names={'ix_pending_resident_submitter_client_key'}):
+        create_index(connection, index)
+
+
+@migration(10, 'Add resident blocking keys for duplicate detection, filled for every resident')
+def add_resident_blocking_keys(connection, batch_size=5000):
+    present = {c['name'] for c in db.inspect(connection).get_columns('resident')}
+    for name, length in (('dedupe_dob_key', 20), ('dedupe_year_key', 120)):
+        if name not in present:
+            connection.execute(db.text(f'ALTER TABLE resident ADD COLUMN {name} VARCHAR({length})'))
+    t = Resident.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(db.select(t.c.id, *(t.c[f] for f in DEDUPE_FIELDS))
+                                  .where(t.c.id > last_id).order_by(t.c.id).limit(batch_size)).mappings().all()
+        if not rows:
+            break
+        connection.execute(t.update().where(t.c.id == db.bindparam('row_id')),
+                           [dict(resident_blocking_keys(row), row_id=row['id']) for row in rows])
+        last_id = rows[-1]['id']
+    for index in table_indexes(Resident, names={'ix_resident_dedupe_dob_key', 'ix_resident_dedupe_year_key'}):
+        create_index(connection, index)
+
+
+@migration(11, 'Drop the gender/voter_status/senior_citizen indexes: two or three values each, never queried alone')
+def drop_low_cardinality_indexes(connection):
+    for name in ('ix_resident_gender', 'ix_resident_voter_status', 'ix_resident_senior_citizen'):
+        connection.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+
+
+@migration(12, 'Add lower(column) indexes for the case-insensitive household typeahead')
+def add_household_lookup_indexes(connection):
+    for index in table_indexes(Household, names={index.name for index in HOUSEHOLD_LOOKUP_INDEXES.values()}):
+        create_index(connection, index)
+
+
+schema_migrations = db.Table(
+    'schema_migrations', db.MetaData(),
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(255), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.execute(db.select(schema_migrations.c.version)).scalars())
+
+def upgrade(verbose=True):
+    """Apply every pending migration, each in its own transaction."""
+    with db.engine.begin() as connection:
+        done = applied_versions(connection)
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with db.engine.begin() as connection:
+            fn(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, description=description,
+                applied_at=datetime.datetime.utcnow()))
+        if verbose:
+            print(f'Applied {version:04d}: {description}')
+
+def drop_unmanaged_tables(connection):
+    """Drop tables db.drop_all() does not know about (used by setup_db.py)."""
+    connection.execute(db.text('DROP TABLE IF EXISTS resident_fts'))
+    schema_migrations.drop(connection, checkfirst=True)
+
+def status():
+    with db.engine.begin() as connection:
+        done = applied_versions(connection)
+    for version, description, _ in MIGRATIONS:
+        print(f"[{'x' if version in done else ' '}] {version:04d} {description}")
+
+
+# Queries issued by the hot routes, shaped exactly as the routes build them.
+# --explain prints their plans so a missing index shows up as a full scan.
+def route_queries():
+    cursor = ('Juan', 1)
+    yield 'residents (first page)', (
+        Resident.query.order_by(Resident.first_name, Resident.id).limit(51))
+    yield 'residents (next page)', (
+        Resident.query.filter(db.tuple_(Resident.first_name, Resident.id) > db.tuple_(*cursor))
+        .order_by(Resident.first_name, Resident.id).limit(51))
+    yield 'residents (previous page)', (
+        Resident.query.filter(db.tuple_(Resident.first_name, Resident.id) < db.tuple_(*cursor))
+        .order_by(Resident.first_name.desc(), Resident.id.desc()).limit(51))
+    yield 'household_detail members', (
+        Resident.query.filter_by(household_id=1).order_by(Resident.last_name, Resident.first_name))
+    yield 'resident_info', Resident.query.filter_by(id=1)
+    yield 'dashboard', PopulationStats.query.filter_by(id=1)
+    yield 'pending_residents (admin)', (
+        PendingResident.query.filter_by(status='pending').order_by(PendingResident.submitted_at.desc()))
+    yield 'pending_residents (user)', (
+        PendingResident.query.filter_by(submitted_by=1).order_by(PendingResident.submitted_at.desc()))
+    yield 'elected_officials (kagawads)', (
+        ElectedOfficial.query.filter_by(position='Kagawad')
+        .order_by(ElectedOfficial.order.is_(None), ElectedOfficial.order))
+    yield 'household lookup by number', Household.query.filter_by(household_no='0001')
+    yield 'household_list (by barangay)', (
+        Household.query.filter_by(barangay='San Jose').order_by(Household.household_no).limit(31))
+    yield 'household_list (by purok)', (
+        Household.query.filter_by(purok='Purok 1').order_by(Household.household_no).limit(31))
+    yield 'household_list (household_no prefix)', (
+        Household.query.filter(Household.household_no >= 'HH1', Household.household_no < 'HH1\U0010ffff')
+        .order_by(Household.household_no).limit(31))
+    for column in (Household.household_no, Household.barangay, Household.purok):
+        folded = db.func.lower(column)
+        yield f'household lookup ({column.key} prefix)', (
+            Household.query.filter(folded >= 'san', folded < 'san\U0010ffff')
+            .order_by(folded, Household.household_no).limit(10))
+    yield 'analytics (pyramid for one purok)', (
+        db.session.query(DemographicCell.age_bracket, DemographicCell.gender, db.func.sum(DemographicCell.count))
+        .filter(DemographicCell.purok == 'Purok 1')
+        .group_by(DemographicCell.age_bracket, DemographicCell.gender))
+    yield 'login', Admin.query.filter_by(username='admin')
+    yield 'events in range', (
+        BarangayEvent.query.filter(BarangayEvent.event_date.between(datetime.date(2025, 1, 1),
+                                                                     datetime.date(2025, 1, 31)))
+        .order_by(BarangayEvent.event_date))
+    yield 'changes since cursor', ChangeLogEntry.query.filter(ChangeLogEntry.seq > 1000).order_by(ChangeLogEntry.seq).limit(501)
+    yield 'duplicate check (blocking keys)', (
+        Resident.query.filter(db.or_(Resident.dedupe_dob_key.in_(['S530j:1990-01-01']),
+                                     Resident.dedupe_year_key.in_(['S530j:purok1:1989', 'S530j:purok1:1990'])))
+        .order_by(Resident.id))
+    yield 'duplicate scan (year key order)', (
+        db.select(Resident.id, Resident.dedupe_year_key, Resident.first_name, Resident.date_of_birth)
+        .where(Resident.dedupe_year_key.isnot(None)).order_by(Resident.dedupe_year_key, Resident.id))
+    yield 'job worker claim', (
+        Job.query.filter(db.or_(db.and_(Job.status == 'queued', Job.run_at <= datetime.datetime(2025, 1, 1)),
+                                db.and_(Job.status == 'running', Job.locked_until < datetime.datetime(2025, 1, 1),
+                                        Job.attempts < Job.max_attempts)))
+        .order_by(Job.run_at, Job.id).limit(1))
+    if db.engine.dialect.name == 'sqlite':
+        weights = ', '.join(str(w) for w in RESIDENT_FTS_WEIGHTS)
+        yield 'residents search', db.text(
+            f"SELECT rowid, bm25(resident_fts, {weights}) AS score FROM resident_fts "
+            f"WHERE resident_fts MATCH '{resident_match_queries('juan cruz')[0]}' "
+            f"ORDER BY score, rowid LIMIT 51")
+
+def compile_sql(query):
+    statement = getattr(query, 'statement', query)
+    if isinstance(statement, db.TextClause):
+        return statement.text
+    return str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+def explain():
+    """Print the plan of each route query; return how many scan a whole table."""
+    sqlite = db.engine.dialect.name == 'sqlite'
+    full_scans = 0
+    for name, query in route_queries():
+        sql = compile_sql(query)
+        plan = db.session.execute(db.text(('EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN ') + sql)).all()
+        lines = [row[-1] for row in plan]
+        # SQLite reports an unindexed full table walk as "SCAN <table>" with no
+        # "USING ... INDEX"; PostgreSQL as "Seq Scan".
+        scans = [l for l in lines if (l.startswith('SCAN ') and 'USING' not in l and 'VIRTUAL TABLE' not in l)
+                 or 'Seq Scan' in l]
+        full_scans += bool(scans)
+        print(f"{'FULL SCAN' if scans else 'ok':9}  {name}")
+        for line in lines:
+            print(f'           {line}')
+    return full_scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--status', action='store_true', help='show applied/pending migrations')
+    parser.add_argument('--explain', action='store_true', help='print query plans for route queries')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            status()
+        elif args.explain:
+            raise SystemExit(1 if explain() else 0)
+        else:
+            # Only creates tables that do not exist yet; existing ones are left to the migrations.
+            db.create_all()
+            upgrade()
+
+if __name__ == '__main__':
+    main()
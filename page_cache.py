@@ -0,0 +1,202 @@
+"""Server-side page cache with conditional GET, shared across gunicorn workers.
+
+Read-heavy views are wrapped with ``@page_cache.cached('household', 'resident')``.
+Each name is an entity type with a version counter, and any committed write
+to that entity bumps its version (see the session hooks in app.py). A page is
+stored under a key made of the URL, the viewer's role and the current versions
+of its entities, so a write makes the old entries unreachable and they age
+out through LRU eviction.
+
+Entries live in a small SQLite file (instance/page_cache.db) that every worker
+process shares. It is bounded by PAGE_CACHE_MAX_BYTES, and the least recently
+used pages are evicted first. Responses carry an ETag (a hash of the body) and
+Last-Modified (the last write to any of the page's entities), so a browser
+revalidating an unchanged page gets a 304 without the page being re-rendered.
+
+PAGE_CACHE_ENABLED=0 turns the whole layer off.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import Response, make_response, request
+from flask.globals import request_ctx
+from flask_login import current_user
+
+from db_config import env_bool, env_int
+
+ACCESS_RESOLUTION = 30  # seconds; LRU timestamps are refreshed at most this often
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    entity TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    last_modified REAL NOT NULL,
+    mimetype TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pages_accessed ON pages (accessed);
+"""
+
+
+class PageCache:
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, namespace='', enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.enabled = enabled
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def versions(self, entities):
+        """Return ({entity: version}, last write time) for ``entities``."""
+        placeholders = ','.join('?' * len(entities))
+        rows = self.connection().execute(
+            f'SELECT entity, version, updated_at FROM versions WHERE entity IN ({placeholders})',
+            list(entities)).fetchall()
+        found = {entity: (version, updated_at) for entity, version, updated_at in rows}
+        versions = {entity: found.get(entity, (0, 0))[0] for entity in entities}
+        return versions, max((updated_at for _, updated_at in found.values()), default=0)
+
+    def bump(self, entities):
+        """Invalidate every page that depends on one of ``entities``."""
+        if not (self.enabled and entities):
+            return
+        now = time.time()
+        with self.connection() as conn:
+            conn.executemany(
+                'INSERT INTO versions (entity, version, updated_at) VALUES (?, 1, ?) '
+                'ON CONFLICT (entity) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at',
+                [(entity, now) for entity in sorted(entities)])
+
+    def get(self, key):
+        conn = self.connection()
+        row = conn.execute('SELECT etag, last_modified, mimetype, body, accessed FROM pages WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[4] > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute('UPDATE pages SET accessed = ? WHERE key = ?', (now, key))
+        return row[:4]
+
+    def put(self, key, etag, last_modified, mimetype, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        conn = self.connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO pages (key, etag, last_modified, mimetype, body, size, accessed) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (key, etag, last_modified, mimetype, body, len(body), time.time()))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            if total > self.max_bytes:
+                self.evict(conn, total - self.max_bytes)
+
+    @staticmethod
+    def evict(conn, excess):
+        """Delete least recently used pages until ``excess`` bytes are freed."""
+        freed, doomed = 0, []
+        for key, size in conn.execute('SELECT key, size FROM pages ORDER BY accessed'):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany('DELETE FROM pages WHERE key = ?', doomed)
+
+    def clear(self):
+        with self.connection() as conn:
+            conn.execute('DELETE FROM pages')
+
+    def stats(self):
+        count, size = self.connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        lookups = self.hits + self.misses
+        return {'pid': os.getpid(), 'pages': count, 'bytes': size, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None}
+
+    def cached(self, *entities):
+        """Cache a GET view's HTML per URL and role until ``entities`` change."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                versions, last_write = self.versions(entities)
+                role = getattr(current_user, 'role', None) if current_user.is_authenticated else None
+                key = hashlib.sha256(repr((self.namespace, request.full_path, role,
+                                           sorted(versions.items()))).encode()).hexdigest()
+                entry = self.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    etag, last_modified, mimetype, body = entry
+                else:
+                    self.misses += 1
+                    response = make_response(view(*args, **kwargs))
+                    # Pages that displayed this session's flashed messages are not shared.
+                    if response.status_code != 200 or response.direct_passthrough or request_ctx.flashes:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha256(body).hexdigest()[:32]
+                    last_modified = last_write or time.time()
+                    mimetype = response.mimetype
+                    self.put(key, etag, last_modified, mimetype, body)
+
+                response = Response(body, mimetype=mimetype)
+                response.set_etag(etag)
+                response.last_modified = int(last_modified)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                response.vary.add('Cookie')
+                response.headers['X-Page-Cache'] = 'hit' if entry is not None else 'miss'
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+def build_namespace(app):
+    """Fingerprint of the templates and asset manifest, so deploys start fresh."""
+    digest = hashlib.sha256()
+    for root in (app.template_folder and os.path.join(app.root_path, app.template_folder),
+                 os.path.join(app.static_folder, 'dist')):
+        if not root or not os.path.isdir(root):
+            continue
+        for dirpath, _, filenames in sorted(os.walk(root)):
+            for filename in sorted(filenames):
+                st = os.stat(os.path.join(dirpath, filename))
+                digest.update(f'{dirpath}/{filename}:{st.st_mtime_ns}:{st.st_size};'.encode())
+    return digest.hexdigest()[:16]
+
+
+def init_page_cache(app):
+    cache = PageCache(
+        app.config.setdefault('PAGE_CACHE_PATH', os.environ.get('PAGE_CACHE_PATH', os.path.join(app.instance_path, 'page_cache.db'))),
+        max_bytes=app.config.setdefault('PAGE_CACHE_MAX_BYTES', env_int('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        namespace=build_namespace(app),
+        enabled=app.config.setdefault('PAGE_CACHE_ENABLED', env_bool('PAGE_CACHE_ENABLED', True)),
+    )
+    app.extensions['page_cache'] = cache
+    return cache
@@ -0,0 +1,74 @@
+"""Per-request SQL statement budgets, to catch N+1 regressions in development.
+
+Routes declare how many statements they are allowed to issue:
+
+    @app.route('/pending_residents')
+    @query_budget(4)
+    @login_required
+    def pending_residents(): ...
+
+When enabled (QUERY_BUDGET_ENABLED in the config or the environment, which
+defaults to app.debug), every statement sent through SQLAlchemy during a
+request is counted, the count is returned in an X-Query-Count header, and a
+route that goes over its budget is logged (QUERY_BUDGET_MODE='log') or fails with QueryBudgetExceeded
+(QUERY_BUDGET_MODE='raise', meant for tests and benchmarks). When disabled
+the engine hook returns immediately.
+"""
+import os
+from functools import wraps
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db_config import env_bool
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may issue."""
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+def count_statement():
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+def init_query_budget(app):
+    app.config.setdefault('QUERY_BUDGET_MODE', 'log')
+    if 'QUERY_BUDGET_ENABLED' in os.environ:
+        app.config.setdefault('QUERY_BUDGET_ENABLED', env_bool('QUERY_BUDGET_ENABLED', False))
+
+    def enabled():
+        return app.config.get('QUERY_BUDGET_ENABLED', app.debug)
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        count_statement()
+
+    @app.before_request
+    def _start_budget():
+        if enabled():
+            g.query_count = 0
+
+    @app.after_request
+    def _check_budget(response):
+        if 'query_count' not in g:
+            return response
+        count = g.query_count
+        response.headers['X-Query-Count'] = str(count)
+        view = app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None)
+        if limit is not None and count > limit:
+            message = f'{request.endpoint} issued {count} SQL statements (budget {limit})'
+            if app.config['QUERY_BUDGET_MODE'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
@@ -1,11 +1,15 @@
 from app import app, db, Admin, bcrypt
+from migrate import upgrade, drop_unmanaged_tables
 
 def setup_database(drop_first=False):
     with app.app_context():
         if drop_first:
             print('Dropping existing database tables (this will erase data)...')
             db.drop_all()
+            with db.engine.begin() as connection:
+                drop_unmanaged_tables(connection)
         db.create_all()
+        upgrade(verbose=False)
 
         admin = Admin.query.filter_by(username='admin').first()
         if not admin:
@@ -12,69 +12,272 @@ function toggleStats() {
     }
 }
 
-// Calendar state
+// Calendar state; events come from /api/events one visible month at a time
 let currentDate = new Date();
-let selectedDate = null;
-let events = {}; // Store events by date string like "2025-10-15"
+let calendarRender = 0;
+const monthEvents = new Map(); // "2025-10" -> events of that month
+
+function pad(n) {
+    return String(n).padStart(2, '0');
+}
+
+function isoDate(year, month, day) {
+    return `${year}-${pad(month + 1)}-${pad(day)}`;
+}
+
+function eventsRequest(url, options = {}) {
+    return fetch(url, { credentials: 'same-origin', ...options }).then(response => {
+        if (response.status === 204) return null;
+        return response.json().then(body => response.ok ? body : Promise.reject(body.error || response.status));
+    });
+}
+
+function loadMonth(year, month) {
+    const key = `${year}-${pad(month + 1)}`;
+    if (monthEvents.has(key)) return Promise.resolve(monthEvents.get(key));
+    const panel = document.getElementById('eventCalendar');
+    const query = new URLSearchParams({
+        from: isoDate(year, month, 1),
+        to: isoDate(year, month, new Date(year, month + 1, 0).getDate())
+    });
+    return eventsRequest(`${panel.dataset.url}?${query}`).then(data => {
+        monthEvents.set(key, data.months[key] || []);
+        return monthEvents.get(key);
+    });
+}
+
+function forgetMonth(dateStr) {
+    if (dateStr) monthEvents.delete(dateStr.slice(0, 7));
+}
 
 function renderCalendar() {
     const monthYear = document.getElementById('calendarMonthYear');
     const grid = document.getElementById('calendarGrid');
+    if (!monthYear || !grid) return;
 
     const year = currentDate.getFullYear();
     const month = currentDate.getMonth();
+    const render = ++calendarRender;
     monthYear.textContent = `${currentDate.toLocaleString('default', { month: 'long' })} ${year}`;
 
-    grid.innerHTML = '';
+    loadMonth(year, month).then(events => {
+        if (render !== calendarRender) return; // the user already paged to another month
+        const byDate = {};
+        events.forEach(evt => (byDate[evt.date] = byDate[evt.date] || []).push(evt));
 
-    // Days of week headers
-    const days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
-    days.forEach(day => {
-        const dayEl = document.createElement('div');
-        dayEl.className = 'calendar-day';
-        dayEl.textContent = day;
-        grid.appendChild(dayEl);
-    });
+        grid.innerHTML = '';
+        const firstDay = new Date(year, month, 1).getDay();
+        const lastDate = new Date(year, month + 1, 0).getDate();
+        const now = new Date();
+        const today = isoDate(now.getFullYear(), now.getMonth(), now.getDate());
+
+        for (let i = 0; i < firstDay; i++) {
+            const emptyEl = document.createElement('div');
+            emptyEl.className = 'calendar-day empty';
+            grid.appendChild(emptyEl);
+        }
+        for (let date = 1; date <= lastDate; date++) {
+            const dateStr = isoDate(year, month, date);
+            const dayEvents = byDate[dateStr] || [];
+            const dateEl = document.createElement('div');
+            dateEl.className = dateStr === today ? 'calendar-day today' : 'calendar-day';
+            dateEl.dataset.date = dateStr;
+            dateEl.textContent = date;
+            if (dayEvents.length) {
+                const indicator = document.createElement('span');
+                indicator.className = 'event-indicator';
+                indicator.textContent = dayEvents.length;
+                dateEl.title = dayEvents.map(evt => evt.title).join('\n');
+                dateEl.appendChild(indicator);
+            }
+            dateEl.addEventListener('click', () => showDayEvents(dateStr, dayEvents));
+            grid.appendChild(dateEl);
+        }
+    }).catch(err => console.error('Failed to load events', err));
+}
 
-    // Days in month
-    const firstDay = new Date(year, month, 1).getDay();
-    const lastDate = new Date(year, month + 1, 0).getDate();
+function showDayEvents(dateStr, dayEvents) {
+    const tooltip = document.getElementById('eventTooltip');
+    const list = document.getElementById('eventTooltipList');
+    document.getElementById('eventTooltipTitle').textContent =
+        new Date(`${dateStr}T00:00`).toLocaleDateString('default', { dateStyle: 'long' });
+    list.innerHTML = '';
 
-    // empty placeholders
-    for (let i = 0; i < firstDay; i++) {
-        const emptyEl = document.createElement('div');
-        emptyEl.className = 'calendar-cell empty';
-        grid.appendChild(emptyEl);
+    if (!dayEvents.length) {
+        const empty = document.createElement('p');
+        empty.className = 'muted';
+        empty.textContent = 'No events on this day.';
+        list.appendChild(empty);
     }
+    dayEvents.forEach(evt => {
+        const item = document.createElement('div');
+        item.className = 'event-item';
+        const title = document.createElement('div');
+        title.className = 'event-item-title';
+        title.textContent = evt.title;
+        const desc = document.createElement('div');
+        desc.className = 'event-item-desc';
+        desc.textContent = evt.description || (evt.created_by ? `Added by ${evt.created_by}` : '');
+        const actions = document.createElement('div');
+        actions.className = 'event-item-actions';
+        const editBtn = document.createElement('button');
+        editBtn.type = 'button';
+        editBtn.textContent = 'Edit';
+        editBtn.addEventListener('click', () => openEventModal(evt));
+        actions.appendChild(editBtn);
+        item.append(title, desc, actions);
+        list.appendChild(item);
+    });
 
-    for (let date = 1; date <= lastDate; date++) {
-        const dateEl = document.createElement('div');
-        dateEl.className = 'calendar-cell';
-        const dateStr = `${year}-${month + 1}-${date}`; // same format used in events map
-        dateEl.dataset.date = dateStr;
-        dateEl.textContent = date;
-        if (events[dateStr]) {
-            const evt = document.createElement('div');
-            evt.className = 'calendar-event';
-            evt.textContent = events[dateStr];
-            dateEl.appendChild(evt);
-        }
-        dateEl.addEventListener('click', () => selectDate(dateEl));
-        grid.appendChild(dateEl);
-    }
+    const addBtn = document.createElement('button');
+    addBtn.type = 'button';
+    addBtn.className = 'add-event-btn';
+    addBtn.textContent = '+ Add Event';
+    addBtn.addEventListener('click', () => openEventModal({ date: dateStr }));
+    list.appendChild(addBtn);
+    tooltip.style.display = 'block';
 }
 
-function selectDate(el) {
-    if (!el) return;
-    if (selectedDate) {
-        selectedDate.classList.remove('selected');
-    }
-    selectedDate = el;
-    el.classList.add('selected');
+function openEventModal(evt = {}) {
+    document.getElementById('eventTooltip').style.display = 'none';
+    document.getElementById('eventModalTitle').textContent = evt.id ? 'Edit Event' : 'Add Event';
+    document.getElementById('eventId').value = evt.id || '';
+    document.getElementById('eventTitle').value = evt.title || '';
+    document.getElementById('eventDate').value = evt.date || isoDate(currentDate.getFullYear(), currentDate.getMonth(), 1);
+    document.getElementById('eventDate').dataset.original = evt.date || '';
+    document.getElementById('eventDescription').value = evt.description || '';
+    document.getElementById('eventError').style.display = 'none';
+    document.getElementById('deleteEventBtn').style.display = evt.id ? '' : 'none';
+    document.getElementById('eventModal').style.display = 'flex';
+}
+
+function finishEventChange(...dates) {
+    dates.forEach(forgetMonth);
+    document.getElementById('eventModal').style.display = 'none';
+    renderCalendar();
+}
+
+function showEventError(err) {
+    const errorEl = document.getElementById('eventError');
+    errorEl.textContent = typeof err === 'string' ? err : 'Could not save the event.';
+    errorEl.style.display = 'block';
+}
+
+function initCalendar() {
+    const panel = document.getElementById('eventCalendar');
+    if (!panel) return;
+    const dateInput = document.getElementById('eventDate');
+
+    document.getElementById('prevMonthBtn').addEventListener('click', () => {
+        currentDate = new Date(currentDate.getFullYear(), currentDate.getMonth() - 1, 1);
+        renderCalendar();
+    });
+    document.getElementById('nextMonthBtn').addEventListener('click', () => {
+        currentDate = new Date(currentDate.getFullYear(), currentDate.getMonth() + 1, 1);
+        renderCalendar();
+    });
+    document.getElementById('addEventBtn').addEventListener('click', () => openEventModal());
+    document.querySelectorAll('[data-close]').forEach(btn => {
+        btn.addEventListener('click', () => {
+            document.getElementById(btn.dataset.close).style.display = 'none';
+        });
+    });
+
+    document.getElementById('eventForm').addEventListener('submit', e => {
+        e.preventDefault();
+        const id = document.getElementById('eventId').value;
+        const payload = {
+            title: document.getElementById('eventTitle').value,
+            date: dateInput.value,
+            description: document.getElementById('eventDescription').value
+        };
+        eventsRequest(id ? `${panel.dataset.url}/${id}` : panel.dataset.url, {
+            method: id ? 'PATCH' : 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
+        }).then(() => finishEventChange(dateInput.dataset.original, payload.date))
+          .catch(showEventError);
+    });
+
+    document.getElementById('deleteEventBtn').addEventListener('click', () => {
+        const id = document.getElementById('eventId').value;
+        if (!id || !confirm('Delete this event?')) return;
+        eventsRequest(`${panel.dataset.url}/${id}`, { method: 'DELETE' })
+            .then(() => finishEventChange(dateInput.dataset.original))
+            .catch(showEventError);
+    });
+
+    renderCalendar();
+}
+
+// Population pyramid, fed from /api/analytics/demographics (the demographic cube)
+let pyramidChart = null;
+
+function fetchDemographics(url, params) {
+    const query = new URLSearchParams(params);
+    return fetch(`${url}?${query}`, { credentials: 'same-origin' })
+        .then(response => response.ok ? response.json() : Promise.reject(response.status));
+}
+
+function renderPyramid(panel, purok) {
+    const params = { group_by: 'age_bracket,gender' };
+    if (purok) params.purok = purok;
+    fetchDemographics(panel.dataset.url, params).then(data => {
+        // Brackets come sorted youngest first; the pyramid reads oldest at the top.
+        const labels = [...new Set(data.rows.map(row => row.age_bracket))].reverse();
+        const counts = { Male: {}, Female: {} };
+        data.rows.forEach(row => {
+            if (counts[row.gender]) counts[row.gender][row.age_bracket] = row.count;
+        });
+        const males = labels.map(label => -(counts.Male[label] || 0));
+        const females = labels.map(label => counts.Female[label] || 0);
+
+        if (pyramidChart) pyramidChart.destroy();
+        pyramidChart = new Chart(document.getElementById('populationPyramid').getContext('2d'), {
+            type: 'bar',
+            data: {
+                labels: labels,
+                datasets: [
+                    { label: 'Male', data: males, backgroundColor: 'rgba(0, 114, 255, 0.6)' },
+                    { label: 'Female', data: females, backgroundColor: 'rgba(255, 99, 132, 0.6)' }
+                ]
+            },
+            options: {
+                indexAxis: 'y',
+                scales: {
+                    x: { stacked: true, ticks: { callback: value => Math.abs(value) } },
+                    y: { stacked: true }
+                },
+                plugins: {
+                    tooltip: {
+                        callbacks: { label: ctx => `${ctx.dataset.label}: ${Math.abs(ctx.raw)}` }
+                    }
+                }
+            }
+        });
+    }).catch(err => console.error('Failed to load population pyramid', err));
+}
+
+function initPyramid() {
+    const panel = document.getElementById('populationPyramidPanel');
+    if (!panel || typeof Chart === 'undefined') return;
+    const select = document.getElementById('pyramidPurok');
+    fetchDemographics(panel.dataset.url, { group_by: 'purok' }).then(data => {
+        data.rows.forEach(row => {
+            const option = document.createElement('option');
+            option.value = row.purok;
+            option.textContent = `${row.purok} (${row.count})`;
+            select.appendChild(option);
+        });
+    }).catch(err => console.error('Failed to load puroks', err));
+    select.addEventListener('change', () => renderPyramid(panel, select.value));
+    renderPyramid(panel, '');
 }
 
 // Initialize once DOM is ready
 document.addEventListener('DOMContentLoaded', () => {
+    initPyramid();
+
     // Chart.js Graph
     const graphCanvas = document.getElementById('purokBarGraph');
     if (graphCanvas) {
@@ -109,43 +312,10 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // Wire calendar controls (safe now that DOM is loaded)
-    const prevBtn = document.getElementById('prevMonthBtn');
-    const nextBtn = document.getElementById('nextMonthBtn');
-    const addEventBtn = document.getElementById('addEventBtn');
-
-    if (prevBtn) {
-        prevBtn.addEventListener('click', () => {
-            currentDate.setMonth(currentDate.getMonth() - 1);
-            renderCalendar();
-        });
-    }
-    if (nextBtn) {
-        nextBtn.addEventListener('click', () => {
-            currentDate.setMonth(currentDate.getMonth() + 1);
-            renderCalendar();
-        });
-    }
-    if (addEventBtn) {
-        addEventBtn.addEventListener('click', () => {
-            const eventInput = document.getElementById('eventInput');
-            const event = eventInput ? eventInput.value.trim() : '';
-            if (event && selectedDate && selectedDate.dataset.date) {
-                events[selectedDate.dataset.date] = event;
-                if (eventInput) eventInput.value = '';
-                renderCalendar();
-            } else {
-                // Optionally notify user to select a date first
-                console.warn('No date selected or empty event.');
-            }
-        });
-    }
-
-    // Initialize calendar on page load
     const moreStats = document.getElementById('more-stats');
     if (moreStats) {
         moreStats.style.display = 'none'; // hidden by default
     }
 
-    renderCalendar(); // Initialize calendar
+    initCalendar();
 });
\ No newline at end of file
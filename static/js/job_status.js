@@ -0,0 +1,32 @@
+// Poll a background job (/api/jobs/<id>) and show its progress on the import page
+function pollImportJob(panel) {
+    const field = name => panel.querySelector(`[data-job="${name}"]`);
+    fetch(panel.dataset.url, { credentials: 'same-origin' })
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(job => {
+            field('status').textContent = job.status;
+            field('progress').value = job.progress;
+            field('message').textContent = job.error || job.message || '';
+            if (job.status === 'succeeded') {
+                ['imported', 'households_created', 'rejected'].forEach(name => {
+                    field(name).textContent = job.result[name];
+                });
+                if (job.result.report) {
+                    field('report').href = panel.dataset.reportUrl.replace('REPORT', encodeURIComponent(job.result.report));
+                    field('report').style.display = '';
+                }
+                field('summary').style.display = '';
+            } else if (job.status !== 'failed') {
+                setTimeout(() => pollImportJob(panel), 1000);
+            }
+        })
+        .catch(err => {
+            console.error('Failed to load job status', err);
+            setTimeout(() => pollImportJob(panel), 5000);
+        });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const panel = document.getElementById('importJob');
+    if (panel) pollImportJob(panel);
+});
@@ -51,12 +51,176 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// Household toggle function (already in your code)
+// Household picker: a typeahead over /api/households/lookup instead of a
+// <select> holding every household. The chosen id (or "none"/"new") goes in
+// the hidden household_select input the views read.
 function toggleNewHousehold(val) {
     var el = document.getElementById('new_household_fields');
-    if (val === 'new') {
-        el.style.display = 'block';
-    } else {
-        el.style.display = 'none';
+    if (!el) return;
+    el.style.display = val === 'new' ? 'block' : 'none';
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const hidden = document.getElementById('household_select');
+    const search = document.getElementById('household_search');
+    const list = document.getElementById('household_suggestions');
+    if (!hidden || !search || !list) return;
+
+    const DEBOUNCE_MS = 200;
+    const CACHE_SIZE = 50;
+    const cache = new Map(); // query -> households, oldest first
+    let timer = null;
+    let active = -1;
+    let latest = '';
+
+    function lookup(q) {
+        if (cache.has(q)) return Promise.resolve(cache.get(q));
+        // A shorter query that returned fewer than a full page already holds every match.
+        for (let i = q.length - 1; i > 0; i--) {
+            const shorter = cache.get(q.slice(0, i));
+            if (shorter && shorter.complete) {
+                return Promise.resolve(Object.assign(shorter.filter(h => matches(h, q)), { complete: true }));
+            }
+        }
+        const limit = 10; // HOUSEHOLD_LOOKUP_LIMIT
+        return fetch(`${search.dataset.url}?${new URLSearchParams({ q: q, limit: limit })}`, { credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => {
+                const households = Object.assign(data.households, { complete: data.households.length < limit });
+                cache.set(q, households);
+                if (cache.size > CACHE_SIZE) cache.delete(cache.keys().next().value);
+                return households;
+            });
+    }
+
+    function matches(household, q) {
+        const prefix = q.toLowerCase(); // the lookup ignores case too
+        return [household.household_no, household.barangay, household.purok].some(v => v && v.toLowerCase().startsWith(prefix));
+    }
+
+    function choose(value, label) {
+        hidden.value = value;
+        search.value = label;
+        toggleNewHousehold(value);
+        close();
+    }
+
+    function close() {
+        list.hidden = true;
+        search.setAttribute('aria-expanded', 'false');
+        active = -1;
+    }
+
+    function option(label, onPick) {
+        const item = document.createElement('li');
+        item.setAttribute('role', 'option');
+        item.textContent = label;
+        // mousedown, not click: it fires before the input's blur closes the list.
+        item.addEventListener('mousedown', e => { e.preventDefault(); onPick(); });
+        list.appendChild(item);
+    }
+
+    function render(households) {
+        list.innerHTML = '';
+        households.forEach(h => option(h.label, () => choose(String(h.id), h.label)));
+        option('-- No household --', () => choose('none', ''));
+        option('+ Add new household', () => choose('new', '+ New household'));
+        list.hidden = false;
+        search.setAttribute('aria-expanded', 'true');
+        active = -1;
+    }
+
+    function highlight(index) {
+        const items = list.querySelectorAll('li');
+        if (!items.length) return;
+        active = (index + items.length) % items.length;
+        items.forEach((item, i) => item.classList.toggle('active', i === active));
+        items[active].scrollIntoView({ block: 'nearest' });
+    }
+
+    function refresh(q = search.value.trim()) {
+        latest = q;
+        lookup(q).then(households => {
+            if (q === latest) render(households); // ignore answers to older keystrokes
+        }).catch(err => console.error('Household lookup failed', err));
     }
-}
\ No newline at end of file
+
+    search.addEventListener('input', () => {
+        hidden.value = 'none'; // typing discards the previous choice until a new one is picked
+        toggleNewHousehold('none');
+        clearTimeout(timer);
+        timer = setTimeout(refresh, DEBOUNCE_MS);
+    });
+    search.addEventListener('focus', () => {
+        if (hidden.value === 'none') return refresh();
+        search.select(); // the box shows the chosen household's label; start a fresh search
+        refresh('');
+    });
+    search.addEventListener('blur', close);
+    search.addEventListener('keydown', e => {
+        if (list.hidden) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active + (e.key === 'ArrowDown' ? 1 : -1));
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            list.querySelectorAll('li')[active].dispatchEvent(new MouseEvent('mousedown'));
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    toggleNewHousehold(hidden.value);
+});
+
+// Duplicate check: once the name, age or date of birth and purok are filled,
+// ask /api/residents/duplicates for residents sharing a blocking key and
+// require the "Add anyway" box before the form can be submitted.
+document.addEventListener('DOMContentLoaded', function() {
+    const warning = document.getElementById('duplicate_warning');
+    if (!warning) return;
+    const list = document.getElementById('duplicate_list');
+    const confirmBox = document.getElementById('confirm_duplicate');
+    const names = ['last_name', 'first_name', 'date_of_birth', 'age', 'purok'];
+    const inputs = names.map(name => document.getElementById(name)).filter(Boolean);
+    let timer = null;
+    let latest = '';
+
+    function show(duplicates) {
+        list.innerHTML = '';
+        duplicates.forEach(d => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            link.href = d.url;
+            link.target = '_blank';
+            link.textContent = d.name;
+            item.appendChild(link);
+            item.appendChild(document.createTextNode(
+                ` (${d.date_of_birth || 'age ' + d.age}, ${d.purok})`));
+            list.appendChild(item);
+        });
+        warning.hidden = !duplicates.length;
+        confirmBox.required = duplicates.length > 0;
+        if (!duplicates.length) confirmBox.checked = false;
+    }
+
+    function check() {
+        const values = Object.fromEntries(inputs.map(input => [input.name, input.value.trim()]));
+        if (!values.last_name || !values.first_name || !(values.date_of_birth || values.age)) {
+            latest = '';
+            return show([]);
+        }
+        const query = new URLSearchParams(values).toString();
+        if (query === latest) return;
+        latest = query;
+        fetch(`${warning.dataset.url}?${query}`, { credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => { if (query === latest) show(data.duplicates); })
+            .catch(err => console.error('Duplicate check failed', err));
+    }
+
+    inputs.forEach(input => input.addEventListener('change', () => {
+        clearTimeout(timer);
+        timer = setTimeout(check, 300);
+    }));
+});
@@ -0,0 +1,89 @@
+// Infinite scroll for the residents list, fed by /api/residents keyset cursors
+
+document.addEventListener('DOMContentLoaded', function () {
+    const list = document.getElementById('residents-list');
+    const sentinel = document.getElementById('residents-sentinel');
+    const pager = document.getElementById('residents-pager');
+    if (!list || !sentinel || !('IntersectionObserver' in window)) return;
+
+    let nextCursor = list.dataset.nextCursor;
+    let loading = false;
+
+    // Only forward scrolling is handled here; a page opened from a "Previous"
+    // link keeps its plain links.
+    if (new URLSearchParams(window.location.search).has('before')) return;
+    if (pager) pager.style.display = 'none';
+
+    function urlFor(template, id) {
+        return template.replace(/0$/, id);
+    }
+
+    function renderResident(resident) {
+        const li = document.createElement('li');
+        li.className = 'resident-card';
+
+        const name = document.createElement('span');
+        name.className = 'resident-name';
+        name.textContent = `${resident.first_name} ${resident.middle_name} ${resident.last_name}`;
+        li.appendChild(name);
+
+        const actions = document.createElement('div');
+        actions.className = 'resident-actions';
+
+        const info = document.createElement('a');
+        info.href = urlFor(list.dataset.infoUrl, resident.id);
+        info.className = 'btn-primary btn-sm';
+        info.textContent = 'Info';
+        actions.appendChild(info);
+
+        const edit = document.createElement('a');
+        edit.href = urlFor(list.dataset.editUrl, resident.id);
+        edit.className = 'btn-success btn-sm';
+        edit.textContent = 'Edit';
+        actions.appendChild(edit);
+
+        const form = document.createElement('form');
+        form.method = 'POST';
+        form.action = urlFor(list.dataset.deleteUrl, resident.id);
+        form.style.display = 'inline';
+        const del = document.createElement('button');
+        del.type = 'submit';
+        del.className = 'btn-danger btn-sm';
+        del.textContent = 'Delete';
+        del.addEventListener('click', function (e) {
+            if (!confirm('Are you sure you want to delete this resident?')) e.preventDefault();
+        });
+        form.appendChild(del);
+        actions.appendChild(form);
+
+        li.appendChild(actions);
+        return li;
+    }
+
+    function loadMore() {
+        if (loading || !nextCursor) return;
+        loading = true;
+        const params = new URLSearchParams({ after: nextCursor });
+        if (list.dataset.search) params.set('search', list.dataset.search);
+
+        fetch(`${list.dataset.apiUrl}?${params}`, { credentials: 'same-origin' })
+            .then(resp => resp.ok ? resp.json() : Promise.reject(resp.status))
+            .then(data => {
+                data.residents.forEach(r => list.appendChild(renderResident(r)));
+                nextCursor = data.next_cursor;
+                if (!nextCursor) observer.disconnect();
+            })
+            .catch(err => {
+                console.error('Failed to load more residents', err);
+                if (pager) pager.style.display = '';
+                observer.disconnect();
+            })
+            .finally(() => { loading = false; });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting)) loadMore();
+    }, { rootMargin: '400px' });
+
+    if (nextCursor) observer.observe(sentinel);
+});
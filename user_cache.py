@@ -0,0 +1,122 @@
+"""Process-local cache of logged-in user identities for the Flask-Login loader.
+
+Every request that touches current_user would otherwise load the Admin row.
+The loader keeps (id, username, role) for up to USER_CACHE_TTL seconds in an
+LRU of at most USER_CACHE_SIZE entries and returns a lightweight
+CachedUser, so an authenticated page view costs no query for the identity.
+
+Each gunicorn worker has its own cache. invalidate() drops the entry
+locally and rewrites a generation file in the instance folder. Every worker
+stats that file on lookup (no database access) and clears its cache when the
+generation changes, so a deleted user is logged out on all workers at once.
+
+Hit and miss counters are per process; stats() includes the pid so they can
+be compared across workers.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    """The parts of an Admin that requests need: id, username, role."""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f'<CachedUser {self.id} {self.username!r}>'
+
+
+class UserCache:
+    def __init__(self, loader, generation_path, ttl=60, maxsize=1024):
+        self.loader = loader
+        self.generation_path = generation_path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = self.read_generation()
+        self.hits = 0
+        self.misses = 0
+
+    def read_generation(self):
+        try:
+            st = os.stat(self.generation_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def get(self, user_id):
+        generation = self.read_generation()
+        now = time.monotonic()
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        user = self.loader(user_id)
+        if user is None:
+            return None
+        identity = CachedUser(user.id, user.username, user.role)
+        with self.lock:
+            self.entries[user_id] = (now + self.ttl, identity)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id=None):
+        """Forget one user (or everyone) here and in every other worker."""
+        with self.lock:
+            if user_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(user_id, None)
+        os.makedirs(os.path.dirname(self.generation_path), exist_ok=True)
+        tmp = f'{self.generation_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp, self.generation_path)
+        with self.lock:
+            self.generation = self.read_generation()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def init_user_cache(app, login_manager, loader):
+    """Install a cached user_loader; ``loader(user_id)`` fetches the real row."""
+    cache = UserCache(
+        loader,
+        os.path.join(app.instance_path, 'user_cache.generation'),
+        ttl=app.config.get('USER_CACHE_TTL', 60),
+        maxsize=app.config.get('USER_CACHE_SIZE', 1024),
+    )
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return cache.get(int(user_id))
+
+    app.extensions['user_cache'] = cache
+    return cache
@@ -0,0 +1,33 @@
+"""Background job worker (the Procfile ``worker`` entry).
+
+    python worker.py            run jobs until SIGTERM/SIGINT
+    python worker.py --burst    run every queued job, then exit
+
+The job being run when a stop signal arrives is finished first. Run several
+workers for more throughput; each claims jobs on its own (see jobs.py).
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+
+from app import app, job_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--burst', action='store_true', help='exit once the queue is empty')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    with app.app_context():
+        job_queue.work(f'{socket.gethostname()}:{os.getpid()}', stop, burst=args.burst)
+
+
+if __name__ == '__main__':
+    main()